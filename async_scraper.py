@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import httpx
+from playwright.async_api import async_playwright, TimeoutError
+from config import SCRAPER_ENGINE, HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_RETRIES, PAGE_CONCURRENCY, SEARCH_PUSHDOWN
+from query_planner import plan_search
+from filter_engine import compile_filters
+from resource_blocking import ResourceBlocker
+from metrics import METRICS
+from scraper import (
+    CARD_SELECTOR, CARD_FIELD_SELECTORS, EXTRACT_CARDS_JS, WAIT_FOR_CARDS_JS, WAIT_FOR_CARDS_ARGS,
+    NEXT_BUTTON_SELECTOR, HTTP_HEADERS, MAX_PAGES, MAX_LISTINGS, MAX_SCRAPE_TIME,
+    page_url, parse_page, parse_cards_html, pushed, card_links, repeats_first_page, unseen, round_trip
+)
+
+logger = logging.getLogger(__name__)
+
+# Same engines and page semantics as scraper.py, but every page is a task on
+# the running event loop. Cancelling the consumer cancels in-flight
+# navigations and requests and closes the browser.
+
+async def ordered_pages(load, first_page=1, max_pages=MAX_PAGES):
+    tasks = deque()
+    next_page = first_page
+
+    def schedule():
+        nonlocal next_page
+        tasks.append((next_page, asyncio.ensure_future(load(next_page))))
+        next_page += 1
+
+    try:
+        while next_page <= min(first_page + PAGE_CONCURRENCY - 1, max_pages):
+            schedule()
+
+        while tasks:
+            current_page, task = tasks.popleft()
+            try:
+                raw_cards, has_next = await task
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if current_page == first_page:
+                    logger.error(f"Failed to load page: {str(e)}", exc_info=True)
+                    raise
+                logger.warning(f"Pagination error or end reached: {e}")
+                return
+
+            if not raw_cards:
+                return
+            yield current_page, raw_cards
+
+            if current_page >= max_pages:
+                logger.info(f"Reached max pages limit: {max_pages}")
+                return
+            if not has_next:
+                logger.info("No Next button or it's disabled. Stopping pagination.")
+                return
+            if next_page <= max_pages:
+                schedule()
+    finally:
+        for _, task in tasks:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
+async def playwright_pages(plan, max_pages=MAX_PAGES, first_page=1):
+    async with async_playwright() as p:
+        with METRICS.stage("browser_launch"):
+            browser = await p.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context()
+            blocker = ResourceBlocker()
+
+            async def load(page_number):
+                logger.info(f"Scraping page {page_number}")
+                round_trip()
+                page = await context.new_page()
+                try:
+                    round_trip()
+                    await blocker.install_async(page)
+                    with METRICS.stage("navigate"):
+                        round_trip()
+                        response = await page.goto(page_url(page_number, plan), timeout=30000)
+                    with METRICS.stage("wait_selector"):
+                        try:
+                            round_trip()
+                            await page.wait_for_selector(CARD_SELECTOR, timeout=30000 if page_number == first_page else 10000)
+                        except TimeoutError:
+                            # As in scraper.browse_pages: a first page that
+                            # loaded but shows no card is an empty search.
+                            if page_number != first_page or response is None or not response.ok:
+                                raise
+                            logger.info(f"No listing cards on page {page_number}, no results.")
+                            return [], False
+                    with METRICS.stage("wait_cards"):
+                        round_trip()
+                        await page.evaluate(WAIT_FOR_CARDS_JS, WAIT_FOR_CARDS_ARGS)
+                    with METRICS.stage("extract", path="bulk"):
+                        round_trip("extract")
+                        raw_cards = await page.eval_on_selector_all(CARD_SELECTOR, EXTRACT_CARDS_JS, CARD_FIELD_SELECTORS)
+                    with METRICS.stage("pagination"):
+                        next_btn = page.locator(NEXT_BUTTON_SELECTOR)
+                        round_trip()
+                        has_next = await next_btn.count() > 0
+                        if has_next:
+                            round_trip()
+                            has_next = await next_btn.is_enabled()
+                    return raw_cards, has_next
+                finally:
+                    round_trip()
+                    await page.close()
+
+            try:
+                async for item in ordered_pages(load, first_page, max_pages):
+                    yield item
+            finally:
+                blocker.log_summary()
+        finally:
+            await browser.close()
+
+async def http_pages(plan, max_pages=MAX_PAGES, first_page=1):
+    found = False
+    past_end = False
+    async with httpx.AsyncClient(
+        headers=HTTP_HEADERS,
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_POOL_SIZE),
+        transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES),
+    ) as client:
+        async def load(page_number):
+            nonlocal past_end
+            logger.info(f"Fetching page {page_number}")
+            with METRICS.stage("http_fetch"):
+                response = await client.get(page_url(page_number, plan))
+            if response.status_code == 404 and (page_number > 1 or pushed(plan)):
+                past_end = past_end or page_number == first_page
+                return [], False
+            response.raise_for_status()
+            # Parsing a page takes a few ms of CPU; keep it off the event loop.
+            with METRICS.stage("html_parse"):
+                return await asyncio.to_thread(parse_cards_html, response.text)
+
+        async for item in ordered_pages(load, first_page, max_pages):
+            found = True
+            yield item
+
+    # An empty first page that isn't a 404 has its cards rendered client-side.
+    # A pushed-down search is first retried unfiltered by scrape_pages.
+    if not found and not past_end and not pushed(plan) and first_page <= max_pages:
+        logger.info("No listing cards in static HTML, falling back to Playwright.")
+        async for item in playwright_pages(plan, max_pages, first_page):
+            yield item
+
+ENGINES = {
+    "http": http_pages,
+    "playwright": playwright_pages,
+}
+
+async def engine_pages(engine, plan, predicate, max_pages, first_page):
+    pages = ENGINES[engine](plan, max_pages, first_page)
+    seen = set()
+    first_links = None
+    try:
+        async for current_page, raw_cards in pages:
+            logger.info(f"Cards found on page: {len(raw_cards)}")
+            links = card_links(raw_cards)
+            if current_page == first_page:
+                first_links = links
+            elif repeats_first_page(current_page, first_page, links, first_links):
+                break
+            METRICS.count("pages", engine=engine)
+            yield current_page, unseen(parse_page(raw_cards, predicate), seen)
+    finally:
+        await pages.aclose()
+
+async def scrape_pages(filters=None, engine=None, max_pages=MAX_PAGES, first_page=1):
+    engine = engine or SCRAPER_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown scraper engine: {engine}")
+
+    logger.info(f"Scraping CasaYes with filters: {filters} (engine: {engine}, async)")
+    plan = plan_search(filters, SEARCH_PUSHDOWN)
+    predicate = compile_filters(filters)
+    pages = engine_pages(engine, plan, predicate, max_pages, first_page)
+    try:
+        if pushed(plan):
+            # As in scraper.scrape_pages: with nothing on the pushed-down
+            # search's first page, scrape the unfiltered search and filter locally.
+            found = False
+            try:
+                async for item in pages:
+                    found = True
+                    yield item
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if found:
+                    raise
+                logger.warning(f"Pushed-down search failed: {str(e)}")
+            if found:
+                return
+            logger.info("Nothing found with pushdown, retrying the unfiltered search.")
+            await pages.aclose()
+            pages = engine_pages(engine, plan_search(filters, False), predicate, max_pages, first_page)
+
+        async for item in pages:
+            yield item
+    finally:
+        await pages.aclose()
+
+async def iter_casayes(filters=None, engine=None, max_pages=MAX_PAGES, max_listings=MAX_LISTINGS,
+                       max_scrape_time=MAX_SCRAPE_TIME):
+    found = 0
+    pages_scraped = 0
+    start_time = time.time()
+
+    pages = scrape_pages(filters, engine, max_pages)
+    try:
+        async for current_page, page_listings in pages:
+            pages_scraped = current_page
+            found += len(page_listings)
+            yield current_page, page_listings
+
+            if time.time() - start_time > max_scrape_time:
+                logger.warning(f"Scraping stopped: exceeded max scrape time of {max_scrape_time} seconds")
+                break
+            if max_listings and found >= max_listings:
+                logger.info(f"Reached max listings limit: {max_listings}")
+                break
+    finally:
+        await pages.aclose()
+        total_time = time.time() - start_time
+        METRICS.observe("scrape_seconds", total_time)
+        logger.info(f"Scraping completed: {found} listings found across {pages_scraped} pages in {total_time:.2f} seconds")
+
+async def scrape_casayes(filters=None, **kwargs):
+    listings = []
+    async for _, page_listings in iter_casayes(filters, **kwargs):
+        listings.extend(page_listings)
+    return listings
+
+async def with_deadline(items, timeout):
+    # asyncio.wait_for on each step: on timeout the pending step is cancelled,
+    # which unwinds the generator and releases its browser or connections.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(items.__anext__(), deadline - loop.time())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await items.aclose()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+from playwright.sync_api import sync_playwright, Locator, Page
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import extract_cards, extract_cards_per_field, parse_card
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listing_page.html")
+ROUNDS = 5
+
+# Every call below is one IPC message to the browser.
+ROUND_TRIP_METHODS = [
+    (Locator, "count"),
+    (Locator, "is_visible"),
+    (Locator, "inner_text"),
+    (Locator, "get_attribute"),
+    (Page, "eval_on_selector_all"),
+]
+
+round_trips = 0
+
+def count_round_trips():
+    def wrap(fn):
+        def wrapper(*args, **kwargs):
+            global round_trips
+            round_trips += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for cls, name in ROUND_TRIP_METHODS:
+        setattr(cls, name, wrap(getattr(cls, name)))
+
+def run(page, extract):
+    global round_trips
+    round_trips = 0
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        raw_cards = extract(page)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    listings = [l for l in (parse_card(raw, i) for i, raw in enumerate(raw_cards)) if l]
+    return listings, round_trips // ROUNDS, elapsed
+
+if __name__ == "__main__":
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    count_round_trips()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+
+        old, old_trips, old_time = run(page, extract_cards_per_field)
+        new, new_trips, new_time = run(page, extract_cards)
+        browser.close()
+
+    assert old == new, "bulk and per-field extraction disagree"
+    print(f"cards parsed:     {len(new)}")
+    print(f"per-field:        {old_trips:5d} round trips  {old_time * 1000:8.1f} ms/page")
+    print(f"bulk:             {new_trips:5d} round trips  {new_time * 1000:8.1f} ms/page")
+    print(f"speedup:          {old_time / new_time:.1f}x")
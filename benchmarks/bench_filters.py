@@ -0,0 +1,94 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_engine import ListingColumns, compile_filters
+from listing import Listing
+
+LISTINGS = 100_000
+ROUNDS = 5
+LOCATIONS = ["Lisboa, Arroios", "Lisboa, Benfica", "Porto, Bonfim", "Porto, Paranhos", "Braga", "Faro", "Coimbra", None]
+
+QUERIES = [
+    {"typology": "T2", "location": "lisboa", "max_price": 400000},
+    {"min_price": 150000, "max_price": 300000, "area_min": 60, "bedrooms": 2},
+    {"location": "porto", "wc": 2, "area_max": 120},
+    {"typology": ["T2", "T3"], "bedrooms": [2, 3], "max_price": 500000},
+]
+
+def make_listings(n, seed=42):
+    rng = random.Random(seed)
+    listings = []
+    for i in range(n):
+        bedrooms = rng.choice([0, 1, 2, 3, 4, 5, None])
+        price = rng.randrange(50_000, 1_500_000, 1000)
+        listings.append(Listing(
+            title=f"Apartamento T{bedrooms if bedrooms is not None else 1} em venda",
+            price=f"{price:,} €".replace(",", " "),
+            price_value=price,
+            location=rng.choice(LOCATIONS),
+            link=f"https://casayes.pt/pt/imovel/{i}",
+            area=rng.choice([None, rng.randrange(25, 400)]),
+            bedrooms=bedrooms,
+            bathrooms=rng.choice([1, 2, 3, None]),
+        ))
+    return listings
+
+def if_chain(listing, filters):
+    # The per-card checks the engine replaced, kept as the baseline.
+    title, location, price = listing.title, listing.location, listing.price_value
+    area, bedrooms, bathrooms = listing.area, listing.bedrooms, listing.bathrooms
+    if filters.get("typology") and filters["typology"].lower() not in title.lower():
+        return False
+    if filters.get("location") and location and filters["location"].lower() not in location.lower():
+        return False
+    if filters.get("min_price") and price < filters["min_price"]:
+        return False
+    if filters.get("max_price") and price > filters["max_price"]:
+        return False
+    if filters.get("area_min") and (not area or area < filters["area_min"]):
+        return False
+    if filters.get("area_max") and area and area > filters["area_max"]:
+        return False
+    if filters.get("bedrooms") is not None and bedrooms is not None and bedrooms != filters["bedrooms"]:
+        return False
+    if filters.get("wc") is not None and bathrooms is not None and bathrooms != filters["wc"]:
+        return False
+    return True
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    return (time.perf_counter() - start) / ROUNDS, result
+
+def main():
+    listings = make_listings(LISTINGS)
+    columns = ListingColumns(listings)
+    print(f"{LISTINGS} listings, {ROUNDS} rounds per query")
+
+    for filters in QUERIES:
+        predicate = compile_filters(filters)
+        row_time, by_row = timed(lambda: [l for l in listings if predicate(l)])
+        col_time, by_column = timed(lambda: predicate.apply(columns))
+        assert by_row == by_column
+
+        line = f"{filters}\n  {len(by_column)} matches | row: {row_time * 1000:.1f} ms | columnar: {col_time * 1000:.1f} ms"
+        if not any(isinstance(v, list) for v in filters.values()):
+            chain_time, by_chain = timed(lambda: [l for l in listings if if_chain(l, filters)])
+            assert by_chain == by_row
+            line += f" | if-chain: {chain_time * 1000:.1f} ms"
+        print(line)
+
+    predicate = compile_filters(QUERIES[0])
+    sort_time, _ = timed(lambda: predicate.apply(columns, sort="price", limit=100))
+    print(f"Filter + sort by price + top 100: {sort_time * 1000:.1f} ms")
+    # Columns are extracted on first use, then shared by every later query.
+    cold_time, _ = timed(lambda: predicate.apply(ListingColumns(listings)))
+    print(f"First query on a fresh batch (includes column extraction): {cold_time * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent import _parse, extract_intent_from_text
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "intent_queries.json")
+ROUNDS = 200
+
+def legacy_extract(text):
+    # The per-call regex parser intent.py replaced, kept as the baseline.
+    intent = dict.fromkeys(["typology", "wc", "bedrooms", "min_price", "max_price", "area_min", "area_max", "location"])
+    text = text.lower().strip()
+    typology_match = re.search(r"\bt(\d+)\b", text)
+    if typology_match:
+        intent["typology"] = f"T{typology_match.group(1)}"
+    wc_match = re.search(r"(\d+)\s*(wc|wcs)", text)
+    if wc_match:
+        intent["wc"] = int(wc_match.group(1))
+    bedrooms_match = re.search(r"(\d+)\s*(quarto|quartos)", text)
+    if bedrooms_match:
+        intent["bedrooms"] = int(bedrooms_match.group(1))
+    location_stop_words = r"\b(com|até|mais de|no máximo|wc|wcs|t\d|quartos?)\b"
+    location_match = re.search(
+        r"\b(?:em|na)\s+([a-zçãáâéêíóõôú\s\-]+?)(?=\s+" + location_stop_words + r"|$)", text
+    )
+    if location_match:
+        intent['location'] = location_match.group(1).strip()
+    price_matches = re.findall(r"(\d{2,6})\s*€", text)
+    if len(price_matches) >= 2:
+        intent["min_price"] = int(price_matches[0])
+        intent["max_price"] = int(price_matches[1])
+    elif len(price_matches) == 1:
+        if "mais de" in text:
+            intent["min_price"] = int(price_matches[0])
+        elif "até" in text or "no máximo" in text:
+            intent["max_price"] = int(price_matches[0])
+    area_min_match = re.search(r"mais\s+de\s+(\d+)\s*m", text)
+    if area_min_match:
+        intent["area_min"] = int(area_min_match.group(1))
+    area_max_match = re.search(r"até\s+(\d+)\s*m", text)
+    if area_max_match:
+        intent["area_max"] = int(area_max_match.group(1))
+    return intent
+
+def accuracy(parse, corpus):
+    correct = 0
+    for case in corpus:
+        got = {k: v for k, v in parse(case["text"]).items() if v is not None}
+        if got == case["expected"]:
+            correct += 1
+        elif parse is extract_intent_from_text:
+            print(f"  MISMATCH {case['text']!r}: got {got}, expected {case['expected']}")
+    return correct / len(corpus)
+
+def throughput(parse, texts, clear=None):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        if clear:
+            clear()
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    return ROUNDS * len(texts) / elapsed
+
+def main():
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    texts = [case["text"] for case in corpus]
+    print(f"{len(corpus)} queries, {ROUNDS} rounds")
+
+    for name, parse in [("legacy", legacy_extract), ("intent", extract_intent_from_text)]:
+        print(f"{name:>7} accuracy: {accuracy(parse, corpus):.0%}")
+
+    print(f" legacy: {throughput(legacy_extract, texts):,.0f} queries/s")
+    print(f" intent: {throughput(extract_intent_from_text, texts, _parse.cache_clear):,.0f} queries/s (cold cache)")
+    print(f" intent: {throughput(extract_intent_from_text, texts):,.0f} queries/s (cached)")
+    if accuracy(extract_intent_from_text, corpus) < 1:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
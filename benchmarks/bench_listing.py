@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import HAS_MSGPACK, Listing, dumps, loads
+from bench_filters import make_listings
+
+LISTINGS = 100_000
+ROUNDS = 3
+
+def as_dict(listing):
+    # The plain dict shape listings had before Listing.
+    return {
+        "title": listing.title, "price": listing.price, "location": listing.location, "link": listing.link,
+        "area": listing.area, "bedrooms": listing.bedrooms, "bathrooms": listing.bathrooms,
+    }
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(items), items
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    return (time.perf_counter() - start) / ROUNDS, result
+
+def main():
+    source = make_listings(LISTINGS)
+    rows = [l.to_row() for l in source]
+
+    # Field values are shared between both shapes, so this is the container cost.
+    dict_bytes, dicts = measure_memory(lambda: [as_dict(l) for l in source])
+    slot_bytes, _ = measure_memory(lambda: [Listing(*row) for row in rows])
+    print(f"{LISTINGS} listings")
+    print(f"Memory per listing: dict {dict_bytes:.0f} B | Listing {slot_bytes:.0f} B (plus price_value)")
+
+    formats = [
+        ("json dicts", lambda: json.dumps(dicts, separators=(",", ":"), ensure_ascii=False), json.loads),
+        ("json rows", lambda: dumps(source), loads),
+    ]
+    if HAS_MSGPACK:
+        formats.append(("msgpack rows", lambda: dumps(source, "msgpack"), lambda data: loads(data, "msgpack")))
+    else:
+        print("msgpack not installed, skipping it")
+
+    for name, encode, decode in formats:
+        encode_time, data = timed(encode)
+        decode_time, decoded = timed(lambda: decode(data))
+        size = len(data.encode("utf-8") if isinstance(data, str) else data)
+        print(f"{name:>13}: {size / len(source):.0f} B/listing | encode {encode_time * 1000:.1f} ms | "
+              f"decode {decode_time * 1000:.1f} ms")
+        if name != "json dicts":
+            assert decoded == source
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from fixture_server import start_server
+
+RESULTS_DIR = os.path.join(HERE, "results")
+PAGES = 10
+RUNS = 5
+REPORT_LISTINGS = 1000
+THRESHOLD = 0.15
+SCRAPE_FILTERS = {"max_price": 900000}
+REPORT_FILTERS = {"location": "lisboa", "max_price": 900000}
+
+# End-to-end runs against the local fixture server. Every scenario runs in a
+# fresh process so peak RSS is its own; each one does a warm-up run and then
+# reports the median of RUNS runs. Results go to benchmarks/results as JSON,
+# and --compare flags metrics that got worse than a previous file by more
+# than the threshold:
+#
+#   python benchmarks/bench_suite.py --compare benchmarks/results/<baseline>.json
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux. Browser processes are not included.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def quiet():
+    import logging
+    logging.disable(logging.WARNING)
+
+def stage_medians(metrics):
+    stages = {}
+    for name, labels, count, total, samples in metrics.snapshot()["timings"]:
+        if name != "stage_seconds" or not samples:
+            continue
+        labels = dict(labels)
+        stage = labels.pop("stage")
+        key = "/".join([stage, *labels.values()])
+        stages[key] = round(statistics.median(samples), 5)
+    return stages
+
+def bench_scrape(base_url, engine, pages, runs):
+    # config reads the base URL at import, so it is set before the scraper loads.
+    os.environ["CASAYES_BASE_URL"] = base_url
+    quiet()
+    from playwright.sync_api import Error as PlaywrightError
+    from scraper import iter_casayes
+    from metrics import METRICS
+
+    samples = []
+    for run in range(runs + 1):
+        start = time.perf_counter()
+        first = None
+        page_count = listing_count = 0
+        try:
+            for _, batch in iter_casayes(SCRAPE_FILTERS, engine=engine, max_pages=pages, max_listings=None):
+                page_count += 1
+                listing_count += len(batch)
+                if first is None and batch:
+                    first = time.perf_counter() - start
+        except PlaywrightError as e:
+            return {"skipped": str(e).strip().splitlines()[0]}
+        if run:
+            samples.append((time.perf_counter() - start, first))
+
+    seconds = statistics.median(s for s, _ in samples)
+    firsts = [f for _, f in samples if f is not None]
+    return {
+        "pages": page_count,
+        "listings": listing_count,
+        "seconds": round(seconds, 4),
+        "pages_per_s": round(page_count / seconds, 1),
+        "listings_per_s": round(listing_count / seconds, 1),
+        "time_to_first_result_s": round(statistics.median(firsts), 4) if firsts else None,
+        "stages": stage_medians(METRICS),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_intent(runs):
+    quiet()
+    from bench_intent import CORPUS, accuracy, throughput
+    from intent import _parse, extract_intent_from_text
+
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    texts = [case["text"] for case in corpus]
+    cold = [throughput(extract_intent_from_text, texts, _parse.cache_clear) for _ in range(runs)]
+    cached = [throughput(extract_intent_from_text, texts) for _ in range(runs)]
+    return {
+        "queries": len(texts),
+        "accuracy": accuracy(extract_intent_from_text, corpus),
+        "cold_queries_per_s": round(statistics.median(cold)),
+        "cached_queries_per_s": round(statistics.median(cached)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_report(fmt, runs):
+    quiet()
+    from bench_filters import make_listings
+    from reports import EXPORTERS, REPORT_CACHE, export_report
+
+    if fmt not in EXPORTERS:
+        return {"skipped": f"{fmt} exporter unavailable"}
+    listings = make_listings(REPORT_LISTINGS)
+    times = []
+    for run in range(runs + 1):
+        REPORT_CACHE.clear()
+        start = time.perf_counter()
+        document, _ = export_report(listings, REPORT_FILTERS, fmt)
+        elapsed = time.perf_counter() - start
+        with document:
+            size = len(document.read())
+        if run:
+            times.append(elapsed)
+
+    seconds = statistics.median(times)
+    return {
+        "rows": len(listings),
+        "size_kb": round(size / 1024, 1),
+        "seconds": round(seconds, 4),
+        "rows_per_s": round(len(listings) / seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def scenarios(static_url, lazy_url, pages, runs):
+    return {
+        "scrape_http": (bench_scrape, (static_url, "http", pages, runs)),
+        "scrape_playwright": (bench_scrape, (static_url, "playwright", pages, runs)),
+        # Cards are rendered client-side, so this measures the HTTP miss,
+        # the browser fallback and the lazy-load wait together.
+        "scrape_lazy": (bench_scrape, (lazy_url, "http", pages, runs)),
+        "intent": (bench_intent, (runs,)),
+        "report_pdf": (bench_report, ("pdf", runs)),
+        "report_csv": (bench_report, ("csv", runs)),
+        "report_jsonl": (bench_report, ("jsonl", runs)),
+        "report_xlsx": (bench_report, ("xlsx", runs)),
+    }
+
+def run_isolated(fn, args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(fn, *args).result()
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+def flatten(results):
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{name}.{metric}", value
+
+def compare(baseline, current, threshold):
+    # Throughput (*_per_s) should not drop, durations (*_s) and sizes
+    # (*_mb, *_kb) should not grow; counts should not change at all.
+    old = dict(flatten(baseline["results"]))
+    regressions = []
+    print(f"\nAgainst {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+    for key, value in flatten(current["results"]):
+        if key not in old:
+            continue
+        before = old[key]
+        change = (value - before) / before if before else 0.0
+        if key.endswith("_per_s"):
+            worse = change < -threshold
+        elif key.endswith(("_s", "_mb", "_kb")):
+            worse = change > threshold
+        else:
+            worse = value != before
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {key:<40} {before:>12g} -> {value:<12g} {change:+7.1%}{flag}")
+        if worse:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks against the CasaYes fixture server")
+    parser.add_argument("--pages", type=int, default=PAGES)
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every fixture response")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    static_server, static_url = start_server(args.pages, latency=args.latency / 1000)
+    lazy_server, lazy_url = start_server(args.pages, lazy=True, latency=args.latency / 1000)
+    selected = scenarios(static_url, lazy_url, args.pages, args.runs)
+    if args.only:
+        names = args.only.split(",")
+        unknown = set(names) - set(selected)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        selected = {name: selected[name] for name in names}
+
+    commit = git_commit()
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    report = {
+        "meta": {
+            "timestamp": timestamp,
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pages": args.pages,
+            "runs": args.runs,
+            "latency_ms": args.latency,
+            "env": {k: os.environ[k] for k in ("PAGE_CONCURRENCY", "SEARCH_PUSHDOWN", "CARDS_SETTLE_MS")
+                    if k in os.environ},
+        },
+        "results": {},
+    }
+    try:
+        for name, (fn, fn_args) in selected.items():
+            result = run_isolated(fn, fn_args)
+            report["results"][name] = result
+            if "skipped" in result:
+                print(f"{name:<18} skipped: {result['skipped']}")
+                continue
+            summary = ", ".join(f"{k}={v}" for k, v in result.items() if k != "stages")
+            print(f"{name:<18} {summary}")
+    finally:
+        static_server.shutdown()
+        lazy_server.shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listing_page.html")
+SEARCH_PATH = "/pt/comprar/casaseapartamentos"
+NEXT_BUTTON = '<button data-id="search-pagination-arrow-right-button">'
+GRID_OPEN = '<div class="grid grid-cols-3 gap-6">'
+GRID_CLOSE = '    </div>\n    <nav'
+LAZY_BATCH = 6
+LAZY_DELAY_MS = 150
+
+# Lazy pages ship no cards in the markup, like the live site: the first batch
+# is appended after LAZY_DELAY_MS and each scroll to the bottom loads the
+# next one. The HTTP engine finds nothing and falls back to the browser.
+LAZY_LOADER = """
+<script>
+(() => {
+  const cards = JSON.parse(document.getElementById("lazy-cards").textContent);
+  const grid = document.querySelector("main .grid");
+  let loading = false;
+  const more = () => {
+    if (loading || !cards.length) return;
+    loading = true;
+    setTimeout(() => {
+      grid.insertAdjacentHTML("beforeend", cards.splice(0, %(batch)d).join(""));
+      loading = false;
+    }, %(delay)d);
+  };
+  window.addEventListener("scroll", more);
+  more();
+})();
+</script>
+"""
+
+def lazy_page(html):
+    start = html.index(GRID_OPEN) + len(GRID_OPEN)
+    end = html.index(GRID_CLOSE, start)
+    cards = html[start:end].split('      <div data-id="listing-card-container"')[1:]
+    cards = ['<div data-id="listing-card-container"' + card.rstrip() for card in cards]
+    payload = json.dumps(cards, ensure_ascii=False).replace("</", "<\\/")
+    script = f'<script id="lazy-cards" type="application/json">{payload}</script>'
+    loader = LAZY_LOADER % {"batch": LAZY_BATCH, "delay": LAZY_DELAY_MS}
+    return html[:start] + "\n" + html[end:].replace("</body>", script + loader + "</body>")
+
+def render_page(template, page_number, total_pages, lazy=False):
+    # Each page reuses the recorded cards with page-unique links.
+    html = template.replace('href="/pt/imovel/', f'href="/pt/imovel/{page_number}-')
+    if page_number >= total_pages:
+        html = html.replace(NEXT_BUTTON, NEXT_BUTTON[:-1] + " disabled>")
+    return lazy_page(html) if lazy else html
+
+def make_handler(total_pages, lazy=False, latency=0.0, failing=()):
+    with open(FIXTURE, encoding="utf-8") as f:
+        template = f.read()
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            page_number = int(parse_qs(url.query).get("page", ["1"])[0])
+            # Search filters in the path and query are ignored, like a site returning a superset.
+            if not url.path.startswith(SEARCH_PATH) or not 1 <= page_number <= total_pages:
+                self.send_error(404)
+                return
+
+            if latency:
+                time.sleep(latency)
+            if page_number in failing:
+                self.send_error(500)
+                return
+            body = render_page(template, page_number, total_pages, lazy).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+def start_server(total_pages=3, port=0, lazy=False, latency=0.0, failing=()):
+    # latency is added to every response, in seconds; pages in failing answer 500.
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(total_pages, lazy, latency, set(failing)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server, url = start_server(total_pages=int(os.getenv("FIXTURE_PAGES", "3")), port=port,
+                               lazy=os.getenv("FIXTURE_LAZY") == "1")
+    print(f"Serving CasaYes fixture at {url}{SEARCH_PATH} (set CASAYES_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
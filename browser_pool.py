@@ -0,0 +1,170 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class _Slot:
+    # Playwright's sync API is bound to the thread that started it, so every
+    # slot is a worker thread owning one browser and one reusable context.
+    def __init__(self, index, max_uses, stats):
+        self.index = index
+        self.max_uses = max_uses
+        self.stats = stats
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.uses = 0
+
+    def acquire(self):
+        if self.context is not None and self.uses >= self.max_uses:
+            logger.info(f"Browser slot {self.index}: recycling context after {self.uses} uses")
+            self.recycle()
+        if self.browser is not None and not self.browser.is_connected():
+            logger.warning(f"Browser slot {self.index}: browser disconnected, relaunching")
+            self.close()
+
+        if self.context is None:
+            self.stats.record_checkout(hit=False)
+            if self.browser is None:
+                if self.playwright is None:
+                    self.playwright = sync_playwright().start()
+                with METRICS.stage("browser_launch"):
+                    self.browser = self.playwright.chromium.launch(headless=True)
+            with METRICS.stage("context_create"):
+                self.context = self.browser.new_context()
+            self.uses = 0
+        else:
+            self.stats.record_checkout(hit=True)
+
+        self.uses += 1
+        return self.context
+
+    def recycle(self):
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception as e:
+                logger.warning(f"Browser slot {self.index}: failed to close context: {e}")
+            self.context = None
+            self.stats.record_recycle()
+
+    def close(self):
+        self.recycle()
+        try:
+            if self.browser is not None:
+                self.browser.close()
+            if self.playwright is not None:
+                self.playwright.stop()
+        except Exception as e:
+            logger.warning(f"Browser slot {self.index}: failed to shut down: {e}")
+        self.browser = None
+        self.playwright = None
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recycles = 0
+        self.jobs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_recycle(self):
+        with self._lock:
+            self.recycles += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.jobs += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "recycles": self.recycles,
+                "jobs": self.jobs,
+                "avg_wait": self.total_wait / self.jobs if self.jobs else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+class BrowserPool:
+    def __init__(self, size=2, max_uses=20):
+        self.size = size
+        self.stats = PoolStats()
+        self._jobs = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        self._threads = []
+        for i in range(size):
+            slot = _Slot(i, max_uses, self.stats)
+            thread = threading.Thread(target=self._worker, args=(slot,), name=f"browser-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self, slot):
+        self._local.slot = slot
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                future, fn, args, kwargs, submitted_at = job
+                self.stats.record_wait(time.monotonic() - submitted_at)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            slot.close()
+
+    def submit(self, fn, *args, **kwargs):
+        if self._closed:
+            raise RuntimeError("Browser pool is shut down")
+        future = Future()
+        self._jobs.put((future, fn, args, kwargs, time.monotonic()))
+        return future
+
+    @contextmanager
+    def checkout(self):
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            raise RuntimeError("BrowserPool.checkout() must run inside a job submitted to the pool")
+        context = slot.acquire()
+        try:
+            yield context
+        except PlaywrightError:
+            # The context may be in a broken state after a browser-side failure.
+            slot.recycle()
+            raise
+
+    def shutdown(self, wait=True):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        logger.info(f"Browser pool shut down: {self.stats.snapshot()}")
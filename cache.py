@@ -0,0 +1,57 @@
+import hashlib
+import json
+import logging
+import time
+from listing import pack_rows, unpack_rows
+
+logger = logging.getLogger(__name__)
+
+def canonical_filters(filters):
+    canonical = {}
+    for key, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = sorted(canonical_filters({key: v}).get(key) for v in value)
+        elif key == "location":
+            value = " ".join(value.lower().split())
+        elif key == "typology":
+            value = value.upper()
+        canonical[key] = value
+    return canonical
+
+def filters_key(filters):
+    payload = json.dumps(canonical_filters(filters), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    # Entries live for ttl + stale_ttl seconds. Past ttl they are still served,
+    # but the caller is told to refresh them in the background.
+    def __init__(self, redis_client, ttl=900, stale_ttl=86400, prefix="results"):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.prefix = prefix
+
+    def _key(self, filters):
+        return f"{self.prefix}:{filters_key(filters)}"
+
+    def get(self, filters):
+        raw = self.redis.get(self._key(filters))
+        if raw is None:
+            self.redis.incr(f"{self.prefix}:stats:misses")
+            return None, False
+
+        entry = json.loads(raw)
+        fresh = time.time() - entry["t"] < self.ttl
+        self.redis.incr(f"{self.prefix}:stats:{'hits' if fresh else 'stale_hits'}")
+        return unpack_rows(entry["rows"]), fresh
+
+    def set(self, filters, results):
+        entry = {"t": time.time(), "rows": pack_rows(results)}
+        self.redis.set(self._key(filters), json.dumps(entry, separators=(",", ":")), ex=self.ttl + self.stale_ttl)
+
+    def stats(self):
+        names = ["hits", "stale_hits", "misses"]
+        values = self.redis.mget([f"{self.prefix}:stats:{n}" for n in names])
+        return {n: int(v or 0) for n, v in zip(names, values)}
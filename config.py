@@ -0,0 +1,111 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "http" fetches listing pages with requests + BeautifulSoup and only launches
+# Chromium when the markup needs JavaScript; "playwright" always uses Chromium.
+SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "http")
+CASAYES_BASE_URL = os.getenv("CASAYES_BASE_URL", "https://casayes.pt").rstrip("/")
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+
+BROWSER_CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", "20"))
+
+# Listing pages fetched in parallel (HTTP requests or browser tabs) per search.
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", "4"))
+
+# Lazy-loaded cards: a page is ready once no new card has appeared for
+# CARDS_SETTLE_MS, or after CARDS_DEADLINE_MS at the latest.
+CARDS_SETTLE_MS = int(os.getenv("CARDS_SETTLE_MS", "500"))
+CARDS_DEADLINE_MS = int(os.getenv("CARDS_DEADLINE_MS", "5000"))
+
+# Translate parsed filters into CasaYes search URL segments and parameters so
+# the site narrows results before we page through them. Off until the
+# parameter names in query_planner are checked against the live site.
+SEARCH_PUSHDOWN = os.getenv("SEARCH_PUSHDOWN", "false").lower() in ("1", "true", "yes")
+
+# Search results are fresh for RESULT_CACHE_TTL seconds, then served stale
+# (while a background scrape refreshes them) for RESULT_CACHE_STALE_TTL more.
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "900"))
+RESULT_CACHE_STALE_TTL = int(os.getenv("RESULT_CACHE_STALE_TTL", "86400"))
+
+# Local snapshot of every listing, refreshed by a background crawl. Searches
+# are answered from it while the last crawl is younger than SNAPSHOT_MAX_AGE.
+# Set SNAPSHOT_CRAWL_INTERVAL=0 to disable the crawler.
+SNAPSHOT_DB_PATH = os.getenv("SNAPSHOT_DB_PATH", "listings.db")
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "21600"))
+SNAPSHOT_CRAWL_INTERVAL = int(os.getenv("SNAPSHOT_CRAWL_INTERVAL", "3600"))
+SNAPSHOT_MAX_PAGES = int(os.getenv("SNAPSHOT_MAX_PAGES", "500"))
+SNAPSHOT_MAX_SCRAPE_TIME = int(os.getenv("SNAPSHOT_MAX_SCRAPE_TIME", "3000"))
+# Incremental crawls stop after this many consecutive pages without a new or
+# changed listing; every SNAPSHOT_FULL_CRAWL_EVERY-th crawl walks all pages.
+SNAPSHOT_STOP_AFTER_UNCHANGED = int(os.getenv("SNAPSHOT_STOP_AFTER_UNCHANGED", "2"))
+SNAPSHOT_FULL_CRAWL_EVERY = int(os.getenv("SNAPSHOT_FULL_CRAWL_EVERY", "6"))
+
+# Minimum seconds between edits of the Telegram progress message while streaming.
+PROGRESS_UPDATE_INTERVAL = float(os.getenv("PROGRESS_UPDATE_INTERVAL", "3"))
+
+# Scrapes run on JOB_WORKERS worker processes fed from a Redis queue.
+# REDIS_URL=fakeredis:// runs everything in-process (workers become threads);
+# JOB_WORKERS=0 scrapes on the bot's own event loop with async_scraper.
+REDIS_URL = os.getenv("REDIS_URL")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "50"))
+JOB_RATE_LIMIT = int(os.getenv("JOB_RATE_LIMIT", "5"))
+JOB_RATE_WINDOW = int(os.getenv("JOB_RATE_WINDOW", "60"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# Workers renew a running job's lease every JOB_LEASE/4 seconds; a job whose
+# lease runs out lost its worker (crashed or killed) and is failed.
+JOB_LEASE = int(os.getenv("JOB_LEASE", "120"))
+
+# Full snapshot crawls split the page range across this many processes.
+CRAWL_SHARD_WORKERS = int(os.getenv("CRAWL_SHARD_WORKERS", "1"))
+
+# Browser requests dropped while scraping. We only read card text and links,
+# so images, fonts, media and trackers are pure overhead. Comma-separated.
+def _csv(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+BLOCK_RESOURCE_TYPES = _csv(os.getenv("BLOCK_RESOURCE_TYPES", "image,media,font"))
+BLOCK_DOMAINS = _csv(os.getenv(
+    "BLOCK_DOMAINS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,"
+    "facebook.net,facebook.com,hotjar.com,clarity.ms,criteo.com,taboola.com"
+))
+ALLOW_DOMAINS = _csv(os.getenv("ALLOW_DOMAINS", ""))
+
+# Location slugs that have a /casaseapartamentos/<slug> page on the site.
+# Only these are pushed down into the search path; others are matched locally.
+SEARCH_LOCATION_SLUGS = set(_csv(os.getenv("SEARCH_LOCATION_SLUGS", "")))
+
+# PDF reports are laid out this many rows at a time; rendered reports for the
+# last REPORT_CACHE_SIZE result sets are kept in memory.
+REPORT_CHUNK_ROWS = int(os.getenv("REPORT_CHUNK_ROWS", "50"))
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "32"))
+# Exported reports are built in memory and only spill to a temp file past this size.
+REPORT_SPOOL_MAX_BYTES = int(os.getenv("REPORT_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics (0 disables).
+# Quantiles cover the last METRICS_SAMPLES observations of each timing.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_SAMPLES = int(os.getenv("METRICS_SAMPLES", "500"))
+# When set, each scrape run dumps a cProfile file (and a Playwright trace for
+# browser runs) into this directory.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
+# Saved searches (/watch): the snapshot is crawled at least every
+# WATCH_INTERVAL seconds while anything is watched, one incremental crawl for
+# all of them, and new or re-priced matches are sent to subscribers (0
+# disables). Alerts go out and the crawl is checked every WATCH_CHECK_INTERVAL.
+WATCH_INTERVAL = int(os.getenv("WATCH_INTERVAL", "3600"))
+WATCH_CHECK_INTERVAL = int(os.getenv("WATCH_CHECK_INTERVAL", "60"))
+WATCH_MAX_PER_CHAT = int(os.getenv("WATCH_MAX_PER_CHAT", "5"))
+# Listings shown per alert message; the rest are counted.
+WATCH_ALERT_LISTINGS = int(os.getenv("WATCH_ALERT_LISTINGS", "10"))
+# A due watch crawl is put off while on-demand searches are queued, for at
+# most this many checks in a row.
+WATCH_MAX_DEFERRALS = int(os.getenv("WATCH_MAX_DEFERRALS", "3"))
@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scraper import scrape_pages, MAX_PAGES
+from store import IncompleteCrawl
+from config import CRAWL_SHARD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+def split_pages(total_pages, shards):
+    shards = max(1, min(shards, total_pages))
+    size, extra = divmod(total_pages, shards)
+    ranges, first = [], 1
+    for i in range(shards):
+        last = first + size - 1 + (1 if i < extra else 0)
+        ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+def crawl_shard(index, first_page, last_page, filters=None, engine=None):
+    # Runs in a worker process with its own HTTP session or browser.
+    start = time.perf_counter()
+    pages = list(scrape_pages(filters, engine=engine, first_page=first_page, max_pages=last_page, strict=True))
+    seconds = time.perf_counter() - start
+    cards = sum(len(listings) for _, listings in pages)
+    return {
+        "shard": index,
+        "first_page": first_page,
+        "last_page": last_page,
+        "pages": len(pages),
+        "cards": cards,
+        "seconds": seconds,
+        "pages_per_second": len(pages) / seconds if seconds else 0.0,
+        "cards_per_second": cards / seconds if seconds else 0.0,
+        "results": pages,
+    }
+
+def run_shards(filters=None, max_pages=MAX_PAGES, workers=CRAWL_SHARD_WORKERS, shards=None, engine=None):
+    # Yields finished shards in page order. A failed shard is logged and
+    # skipped so the others still count, then IncompleteCrawl is raised at the
+    # end. So is a shard that stopped short of its range while a later shard
+    # found pages: the pages in between were never read.
+    ranges = split_pages(max_pages, shards or workers)
+    finished, failed, pages_read = {}, [], {}
+    next_shard = 0
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(crawl_shard, i, first, last, filters, engine): i
+            for i, (first, last) in enumerate(ranges)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                shard = future.result()
+                pages_read[index] = shard["pages"]
+                logger.info(
+                    f"Shard {index} (pages {shard['first_page']}-{shard['last_page']}): {shard['pages']} pages, "
+                    f"{shard['cards']} cards in {shard['seconds']:.2f}s "
+                    f"({shard['pages_per_second']:.2f} pages/s, {shard['cards_per_second']:.1f} cards/s)"
+                )
+            except Exception as e:
+                first, last = ranges[index]
+                logger.error(f"Shard {index} (pages {first}-{last}) failed: {str(e)}")
+                failed.append(index)
+                shard = None
+            finished[index] = shard
+
+            while next_shard in finished:
+                if finished[next_shard] is not None:
+                    yield finished.pop(next_shard)
+                else:
+                    finished.pop(next_shard)
+                next_shard += 1
+
+    if failed:
+        raise IncompleteCrawl(f"{len(failed)} of {len(ranges)} shards failed: {failed}")
+    for index, (first, last) in enumerate(ranges):
+        short = pages_read[index] < last - first + 1
+        if short and any(pages_read[later] for later in range(index + 1, len(ranges))):
+            raise IncompleteCrawl(f"shard {index} stopped after {pages_read[index]} of pages {first}-{last}")
+
+def sharded_pages(filters=None, max_pages=MAX_PAGES, workers=CRAWL_SHARD_WORKERS, engine=None, **kwargs):
+    # Drop-in for scraper.scrape_pages on full crawls; listings already seen on
+    # an earlier page (the site shifts while we crawl) are dropped.
+    seen = set()
+    for shard in run_shards(filters, max_pages, workers, engine=engine):
+        for page_number, listings in shard["results"]:
+            unique = [l for l in listings if l.link not in seen]
+            seen.update(l.link for l in unique)
+            yield page_number, unique
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_PAGES
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else CRAWL_SHARD_WORKERS
+
+    start = time.perf_counter()
+    pages = cards = 0
+    for page_number, listings in sharded_pages(max_pages=total_pages, workers=workers):
+        pages += 1
+        cards += len(listings)
+    elapsed = time.perf_counter() - start
+    print(f"{workers} workers: {pages} pages, {cards} unique listings in {elapsed:.2f}s "
+          f"({pages / elapsed:.2f} pages/s, {cards / elapsed:.1f} listings/s)")
@@ -0,0 +1,164 @@
+import logging
+from functools import lru_cache
+from itertools import compress
+from operator import attrgetter
+from unidecode import unidecode
+
+logger = logging.getLogger(__name__)
+
+# A filter dict is compiled once into a list of (name, column, test) clauses.
+# The same clauses check single listings while a page is parsed, or narrow a
+# ListingColumns batch column by column over cached and snapshot results.
+# Semantics match the original per-card checks: a missing area fails area_min
+# but passes area_max, and missing location, bedrooms or bathrooms pass.
+# List/tuple/set values match any of their members. Text is compared without
+# accents, like the snapshot store, so "evora" finds "Évora".
+
+# Listings share a few thousand distinct locations, and unidecode is the
+# slowest step of a row check, so each one is folded once.
+@lru_cache(maxsize=8192)
+def fold(text):
+    return unidecode(text).lower() if text else ""
+
+EXTRACTORS = {
+    "title": lambda listing: (listing.title or "").lower(),
+    # Folded by the location test, through fold's cache.
+    "location": attrgetter("location"),
+    "price_value": attrgetter("price_value"),
+    "area": attrgetter("area"),
+    "bedrooms": attrgetter("bedrooms"),
+    "bathrooms": attrgetter("bathrooms"),
+}
+
+SORT_COLUMNS = {
+    "price": "price_value",
+    "area": "area",
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "title": "title",
+}
+
+def _members(value):
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+def _contains_any(needles):
+    needles = [fold(str(n)) for n in needles]
+    if len(needles) == 1:
+        needle = needles[0]
+        return lambda text: needle in text
+    return lambda text: any(n in text for n in needles)
+
+def _location(needles):
+    needles = [fold(str(n)) for n in needles]
+    if len(needles) == 1:
+        needle = needles[0]
+        return lambda text: not text or needle in fold(text)
+    return lambda text: not text or any(n in fold(text) for n in needles)
+
+def _range(lo, hi, missing_passes):
+    # One flat lambda per case: a test runs once per listing and clause.
+    if missing_passes:
+        if lo is not None and hi is not None:
+            return lambda v: not v or lo <= v <= hi
+        if lo is not None:
+            return lambda v: not v or v >= lo
+        return lambda v: not v or v <= hi
+    if lo is not None and hi is not None:
+        return lambda v: v is not None and lo <= v <= hi
+    if lo is not None:
+        return lambda v: v is not None and v >= lo
+    return lambda v: v is not None and v <= hi
+
+def _equals_any(values):
+    values = set(values)
+    return lambda v: v is None or v in values
+
+def compile_filters(filters=None):
+    clauses = []
+    filters = filters or {}
+
+    # Numeric clauses first: they are cheaper and usually more selective.
+    if filters.get("min_price") or filters.get("max_price"):
+        clauses.append(("price", "price_value",
+                        _range(filters.get("min_price") or None, filters.get("max_price") or None, False)))
+    if filters.get("area_min"):
+        clauses.append(("area_min", "area", _range(filters["area_min"], None, False)))
+    if filters.get("area_max"):
+        clauses.append(("area_max", "area", _range(None, filters["area_max"], True)))
+    if filters.get("bedrooms") is not None:
+        clauses.append(("bedrooms", "bedrooms", _equals_any(_members(filters["bedrooms"]))))
+    if filters.get("wc") is not None:
+        clauses.append(("wc", "bathrooms", _equals_any(_members(filters["wc"]))))
+    if filters.get("typology"):
+        clauses.append(("typology", "title", _contains_any(_members(filters["typology"]))))
+    if filters.get("location"):
+        clauses.append(("location", "location", _location(_members(filters["location"]))))
+    return ListingFilter(clauses)
+
+class ListingColumns:
+    # Column lists are extracted on first use and kept, so several filters can
+    # run over the same snapshot without re-reading every listing.
+    def __init__(self, listings):
+        self.listings = listings
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.listings)
+
+    def column(self, name):
+        if name not in self._columns:
+            extract = EXTRACTORS[name]
+            self._columns[name] = [extract(listing) for listing in self.listings]
+        return self._columns[name]
+
+class ListingFilter:
+    def __init__(self, clauses):
+        self.clauses = clauses
+        # Extractors are bound here, not looked up for every listing.
+        self.checks = [(name, EXTRACTORS[column], test) for name, column, test in clauses]
+        # Decided once, so rejected cards don't format log lines nobody reads.
+        self.debug = logger.isEnabledFor(logging.DEBUG)
+
+    def __bool__(self):
+        return bool(self.clauses)
+
+    def __call__(self, listing, i=0):
+        for name, extract, test in self.checks:
+            if not test(extract(listing)):
+                if self.debug:
+                    logger.debug(f"Filtered out #{i+1}: {name} check failed for {listing.title}")
+                return False
+        return True
+
+    def select(self, columns):
+        selected = range(len(columns))
+        for _, column, test in self.clauses:
+            values = columns.column(column)
+            selected = list(compress(selected, map(test, map(values.__getitem__, selected))))
+            if not selected:
+                break
+        return list(selected)
+
+    def apply(self, listings, sort=None, limit=None):
+        columns = listings if isinstance(listings, ListingColumns) else ListingColumns(listings)
+        selected = self.select(columns)
+        if sort:
+            selected = sort_indices(columns, selected, sort)
+        if limit:
+            selected = selected[:limit]
+        return [columns.listings[i] for i in selected]
+
+def sort_indices(columns, selected, sort):
+    # "price" sorts ascending, "-price" descending; missing values go last.
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort key: {key}")
+    values = columns.column(SORT_COLUMNS[key])
+    present = [i for i in selected if values[i] is not None]
+    missing = [i for i in selected if values[i] is None]
+    present.sort(key=values.__getitem__, reverse=descending)
+    return present + missing
+
+def filter_listings(listings, filters=None, sort=None, limit=None):
+    return compile_filters(filters).apply(listings, sort, limit)
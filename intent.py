@@ -0,0 +1,243 @@
+import re
+from functools import lru_cache
+from unidecode import unidecode
+
+# Parses free-text searches ("T2 em Lisboa até 300 000€ com 2 wc") into a
+# filter dict. The text is folded to lowercase ASCII once and scanned once by
+# TOKEN_RE; qualifiers ("mais de", "até") apply to the next price or area.
+
+NUMBER = r"\d{1,3}(?:[.\s]\d{3})+|\d+(?:[.,]\d+)?"
+AREA_UNIT = r"(?:m2|m|metros(?:\s+quadrados)?)\b"
+
+TOKEN_RE = re.compile(rf"""
+    (?P<range>\bentre\s+(?P<lo>{NUMBER})\s*(?P<lo_mult>k|mil|milhao|milhoes)?\s*(?:eur(?:os?)?|m2|m)?
+        \s+e\s+(?P<hi>{NUMBER})\s*(?P<hi_mult>k|mil|milhao|milhoes)?\s*(?P<range_unit>eur(?:os?)?|{AREA_UNIT}))
+  | (?P<price>(?P<price_n>{NUMBER})\s*(?P<mult>k|mil|milhao|milhoes)?\s*(?:de\s+)?eur(?:os?)?\b)
+  | (?P<area>(?P<area_n>\d+)\s*{AREA_UNIT})
+  | (?P<wc>(?P<wc_n>\d+)\s*(?:wcs?|casas?\s+de\s+banho)\b)
+  | (?P<bedrooms>(?P<bedrooms_n>\d+)\s*quartos?\b)
+  | (?P<typology>\bt(?P<typology_n>\d+)\b)
+  | (?P<min>\b(?:mais\s+de|acima\s+de|a\s+partir\s+de|desde|minimo(?:\s+de)?)\b)
+  | (?P<max>\b(?:ate|no\s+maximo|maximo(?:\s+de)?|abaixo\s+de|menos\s+de)\b)
+  | (?P<word>[a-z]+(?:-[a-z]+)*)
+""", re.VERBOSE)
+
+DOTTED_THOUSANDS_RE = re.compile(r"\d{1,3}(?:\.\d{3})+")
+
+MULTIPLIERS = {None: 1, "k": 1_000, "mil": 1_000, "milhao": 1_000_000, "milhoes": 1_000_000}
+
+LOCATION_INTROS = {"em", "na", "no", "nas", "nos"}
+LOCATION_STOP_WORDS = {"com", "e", "ou", "no", "para", "por", "perto", "zona", "mais", "ate", "entre",
+                       "formato", "csv", "excel", "xlsx", "json", "jsonl", "pdf"}
+
+# "... em csv", "formato excel": the report format asked for with the search.
+REPORT_FORMAT_RE = re.compile(r"\b(csv|xlsx|excel|folha de calculo|jsonl|json lines|json|pdf)\b")
+REPORT_FORMATS = {
+    "csv": "csv",
+    "xlsx": "xlsx",
+    "excel": "xlsx",
+    "folha de calculo": "xlsx",
+    "jsonl": "jsonl",
+    "json lines": "jsonl",
+    "json": "jsonl",
+    "pdf": "pdf",
+}
+
+# Municipalities and the neighbourhoods people search by, in their canonical
+# spelling. They match anywhere in the text.
+GAZETTEER_NAMES = [
+    # District capitals and islands
+    "Aveiro", "Beja", "Braga", "Bragança", "Castelo Branco", "Coimbra", "Évora", "Faro", "Guarda", "Leiria",
+    "Lisboa", "Portalegre", "Porto", "Santarém", "Setúbal", "Viana do Castelo", "Vila Real", "Viseu",
+    "Funchal", "Ponta Delgada", "Angra do Heroísmo", "Açores", "Porto Santo",
+    # Lisbon metropolitan area
+    "Almada", "Amadora", "Barreiro", "Cascais", "Loures", "Mafra", "Moita", "Montijo", "Odivelas", "Oeiras",
+    "Palmela", "Seixal", "Sesimbra", "Sintra", "Vila Franca de Xira", "Alcochete", "Estoril", "Carcavelos",
+    "Queluz", "Agualva-Cacém", "Costa da Caparica", "Sacavém", "Ericeira", "Algés", "Paço de Arcos",
+    # Lisbon neighbourhoods
+    "Alfama", "Alcântara", "Alvalade", "Areeiro", "Arroios", "Avenidas Novas", "Belém", "Benfica", "Campo de Ourique",
+    "Campolide", "Carnide", "Chiado", "Lumiar", "Marvila", "Misericórdia", "Mouraria",
+    "Olivais", "Parque das Nações", "Penha de França", "Príncipe Real", "Santa Maria Maior", "Santo António",
+    "São Domingos de Benfica", "São Vicente", "Telheiras", "Bairro Alto", "Restelo",
+    # Porto metropolitan area and neighbourhoods
+    "Vila Nova de Gaia", "Gaia", "Matosinhos", "Maia", "Gondomar", "Valongo", "Espinho", "Póvoa de Varzim",
+    "Vila do Conde", "Santo Tirso", "Trofa", "Paredes", "Penafiel", "Santa Maria da Feira", "São João da Madeira",
+    "Oliveira de Azeméis", "Leça da Palmeira", "Boavista", "Foz do Douro", "Bonfim", "Cedofeita",
+    "Paranhos", "Ramalde", "Lordelo do Ouro", "Massarelos", "Aldoar", "Nevogilde",
+    # North and centre
+    "Guimarães", "Barcelos", "Famalicão", "Vila Nova de Famalicão", "Esposende", "Fafe", "Chaves",
+    "Ponte de Lima", "Amarante", "Lamego", "Figueira da Foz", "Ílhavo", "Ovar", "Águeda", "Caldas da Rainha",
+    "Óbidos", "Peniche", "Nazaré", "Alcobaça", "Marinha Grande", "Pombal", "Torres Vedras", "Ourém", "Fátima",
+    "Tomar", "Torres Novas", "Entroncamento", "Abrantes", "Covilhã", "Fundão", "Cantanhede", "Mealhada",
+    # South
+    "Sines", "Grândola", "Alcácer do Sal", "Odemira", "Elvas", "Estremoz", "Montemor-o-Novo",
+    "Lagos", "Portimão", "Albufeira", "Loulé", "Quarteira", "Vilamoura", "Olhão", "Tavira", "Silves",
+    "Vila Real de Santo António", "Castro Marim", "Aljezur", "Vila do Bispo", "Monchique", "São Brás de Alportel",
+    "Algarve", "Alentejo",
+]
+
+# Names that are also common words ("casa de madeira", "renda baixa") only
+# count right after "em"/"na"/...
+INTRO_ONLY_NAMES = ["Madeira", "Estrela", "Graça", "Parede", "Baixa", "Lapa", "Ajuda", "Campanhã", "Lagoa", "Sé", "Luz"]
+
+class FoldTable(dict):
+    # str.translate table filled from unidecode the first time a character is
+    # seen; after warm-up folding runs at C speed instead of per character.
+    def __missing__(self, code):
+        value = self[code] = unidecode(chr(code)).lower()
+        return value
+
+FOLD_TABLE = FoldTable()
+
+def fold(text):
+    return " ".join(text.translate(FOLD_TABLE).split())
+
+GAZETTEER = {fold(name): (name.lower(), True) for name in GAZETTEER_NAMES}
+GAZETTEER.update({fold(name): (name.lower(), False) for name in INTRO_ONLY_NAMES})
+GAZETTEER_MAX_WORDS = max(len(key.split()) for key in GAZETTEER)
+GAZETTEER_FIRST_WORDS = {key.split()[0] for key in GAZETTEER}
+
+def parse_number(text, multiplier=None):
+    text = text.replace(" ", "")
+    if DOTTED_THOUSANDS_RE.fullmatch(text):
+        value = float(text.replace(".", ""))
+    else:
+        value = float(text.replace(",", "."))
+    return int(value * MULTIPLIERS[multiplier])
+
+def match_gazetteer(words, start, after_intro=False):
+    # Longest name starting at words[start].
+    if start >= len(words) or words[start] not in GAZETTEER_FIRST_WORDS:
+        return None
+    for size in range(min(GAZETTEER_MAX_WORDS, len(words) - start), 0, -1):
+        segment = words[start:start + size]
+        if None in segment:
+            continue
+        entry = GAZETTEER.get(" ".join(segment))
+        if entry and (after_intro or entry[1]):
+            return entry[0]
+    return None
+
+def find_location(words, intros):
+    # Gazetteer names right after "em"/"na"/... win, then any gazetteer name,
+    # then whatever free text follows the first intro word.
+    for i in intros:
+        name = match_gazetteer(words, i + 1, after_intro=True)
+        if name:
+            return name
+    for i in range(len(words)):
+        name = match_gazetteer(words, i)
+        if name:
+            return name
+    if intros:
+        captured = []
+        for word in words[intros[0] + 1:]:
+            if word is None or word in LOCATION_STOP_WORDS:
+                break
+            captured.append(word)
+        if captured:
+            return " ".join(captured)
+    return None
+
+@lru_cache(maxsize=4096)
+def _parse(text):
+    intent = {
+        "typology": None,
+        "wc": None,
+        "bedrooms": None,
+        "min_price": None,
+        "max_price": None,
+        "area_min": None,
+        "area_max": None,
+        "location": None,
+    }
+    # words keeps runs of adjacent words; None marks a break (number, comma,
+    # any other token) so a free-text location never spans one.
+    words, intros = [], []
+    unqualified_prices = []
+    bound = None
+    # A qualifier right after a lone price ("300000€ no máximo") binds back
+    # to it unless a number follows for it to bind to.
+    pending_price = None
+    trailing = None
+    last_end = 0
+
+    def bind_back(trailing):
+        qualifier, value = trailing
+        intent["min_price" if qualifier == "min" else "max_price"] = value
+        unqualified_prices.remove(value)
+
+    for m in TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind != "word" or text[last_end:m.start()].strip():
+            if words and words[-1] is not None:
+                words.append(None)
+        last_end = m.end()
+
+        if kind == "word":
+            word = m.group("word")
+            if word in LOCATION_INTROS:
+                intros.append(len(words))
+            words.append(word)
+            continue
+
+        # "100000€ até 200000€": the lone price before "até" is the low end.
+        range_start = trailing[1] if kind == "price" and trailing and trailing[0] == "max" else None
+        if trailing and kind not in ("price", "area", "min", "max"):
+            bind_back(trailing)
+        if kind not in ("min", "max"):
+            trailing = None
+
+        if kind in ("min", "max"):
+            bound = kind
+            trailing = (kind, pending_price) if pending_price is not None else None
+        elif kind == "typology":
+            intent["typology"] = f"T{m.group('typology_n')}"
+        elif kind == "wc":
+            intent["wc"] = int(m.group("wc_n"))
+        elif kind == "bedrooms":
+            intent["bedrooms"] = int(m.group("bedrooms_n"))
+        elif kind == "range":
+            lo = parse_number(m.group("lo"), m.group("lo_mult") or m.group("hi_mult"))
+            hi = parse_number(m.group("hi"), m.group("hi_mult"))
+            if m.group("range_unit").startswith("eur"):
+                intent["min_price"], intent["max_price"] = min(lo, hi), max(lo, hi)
+            else:
+                intent["area_min"], intent["area_max"] = min(lo, hi), max(lo, hi)
+        elif kind == "price":
+            value = parse_number(m.group("price_n"), m.group("mult"))
+            if range_start is not None:
+                intent["min_price"], intent["max_price"] = min(range_start, value), max(range_start, value)
+                unqualified_prices.remove(range_start)
+                pending_price = None
+            elif bound:
+                intent["min_price" if bound == "min" else "max_price"] = value
+                pending_price = None
+            else:
+                unqualified_prices.append(value)
+                pending_price = value
+        elif kind == "area":
+            if bound:
+                intent["area_min" if bound == "min" else "area_max"] = int(m.group("area_n"))
+        if kind not in ("min", "max"):
+            bound = None
+        if kind not in ("min", "max", "price"):
+            pending_price = None
+
+    if trailing:
+        bind_back(trailing)
+    if len(unqualified_prices) >= 2 and intent["min_price"] is None and intent["max_price"] is None:
+        intent["min_price"], intent["max_price"] = unqualified_prices[0], unqualified_prices[1]
+
+    intent["location"] = find_location(words, intros)
+    return tuple(intent.items())
+
+def extract_intent_from_text(text):
+    # Cached on the folded text ("€" folds to "eur", "m²" to "m2"), so
+    # "T2 em Évora" and "t2 em evora" share an entry. Callers get their own
+    # dict to modify.
+    return dict(_parse(fold(text)))
+
+def extract_report_format(text, default="pdf"):
+    match = REPORT_FORMAT_RE.search(fold(text))
+    return REPORT_FORMATS[match.group(1)] if match else default
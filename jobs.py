@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+import redis
+from cache import filters_key
+from listing import pack_rows, unpack_rows
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_fake_server = None
+
+def make_redis(url):
+    # "fakeredis://" gives an in-process Redis for local runs and tests. Every
+    # client made here shares one server, but it is invisible to other processes.
+    global _fake_server
+    if url and url.startswith("fakeredis://"):
+        import fakeredis
+        if _fake_server is None:
+            _fake_server = fakeredis.FakeServer()
+        return fakeredis.FakeRedis(server=_fake_server, decode_responses=True)
+    return redis.Redis.from_url(url, decode_responses=True)
+
+class QueueFull(Exception):
+    pass
+
+class RateLimited(Exception):
+    pass
+
+class JobFailed(Exception):
+    pass
+
+class ScrapeQueue:
+    # Jobs are hashes at {prefix}:{id}, queued as ids on the {prefix}:queue list.
+    # Identical in-flight jobs share one id through {prefix}:inflight:{key}, and
+    # workers append each page of results to {prefix}:{id}:batches so every
+    # waiter can stream them. Running jobs sit in {prefix}:running with the
+    # time of their worker's last heartbeat; one older than lease seconds
+    # lost its worker and is failed, so nothing keeps joining it.
+    def __init__(self, redis_client, max_queued=50, rate_limit=5, rate_window=60, result_ttl=3600, lease=120,
+                 prefix="jobs"):
+        self.redis = redis_client
+        self.max_queued = max_queued
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.result_ttl = result_ttl
+        self.lease = lease
+        self.prefix = prefix
+
+    def _job_key(self, job_id):
+        return f"{self.prefix}:{job_id}"
+
+    def _inflight_key(self, kind, payload):
+        return f"{self.prefix}:inflight:{kind}:{filters_key(payload)}"
+
+    def _check_rate(self, user_id):
+        key = f"{self.prefix}:rate:{user_id}"
+        count = self.redis.incr(key)
+        if count == 1:
+            self.redis.expire(key, self.rate_window)
+        if count > self.rate_limit:
+            raise RateLimited(f"Limite de {self.rate_limit} pesquisas por {self.rate_window}s atingido")
+
+    def submit(self, payload=None, kind="search", user_id=None):
+        if user_id is not None:
+            self._check_rate(user_id)
+        self.reap()
+
+        inflight_key = self._inflight_key(kind, payload)
+        existing = self.redis.get(inflight_key)
+        if existing and self.redis.exists(self._job_key(existing)):
+            logger.info(f"Joining in-flight {kind} job {existing}")
+            return existing
+
+        if self.redis.llen(f"{self.prefix}:queue") >= self.max_queued:
+            raise QueueFull("Fila de pesquisas cheia, tente novamente mais tarde")
+
+        job_id = uuid.uuid4().hex
+        if not self.redis.set(inflight_key, job_id, nx=True, ex=self.result_ttl):
+            # Lost a race with an identical submission.
+            return self.redis.get(inflight_key)
+
+        self.redis.hset(self._job_key(job_id), mapping={
+            "kind": kind,
+            "payload": json.dumps(payload),
+            "status": "queued",
+            "created": time.time(),
+            "inflight_key": inflight_key,
+        })
+        self.redis.expire(self._job_key(job_id), self.result_ttl)
+        self.redis.rpush(f"{self.prefix}:queue", job_id)
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id
+
+    def position(self, job_id):
+        index = self.redis.lpos(f"{self.prefix}:queue", job_id)
+        return index + 1 if index is not None else None
+
+    def queued(self):
+        return self.redis.llen(f"{self.prefix}:queue")
+
+    async def follow(self, job_id, on_position=None, poll_interval=0.5, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        offset = 0
+        last_position = None
+        while True:
+            status, error, heartbeat = self.redis.hmget(self._job_key(job_id), ["status", "error", "heartbeat"])
+            # Batches are all written before the status flips to done, so reading
+            # them after the status never misses the tail.
+            for raw in self.redis.lrange(f"{self._job_key(job_id)}:batches", offset, -1):
+                offset += 1
+                batch = json.loads(raw)
+                yield batch["page"], unpack_rows(batch["rows"])
+
+            if status == "done":
+                return
+            if status == "failed":
+                raise JobFailed(error)
+            if status is None:
+                raise JobFailed("A pesquisa expirou")
+            if status == "running" and heartbeat and time.time() - float(heartbeat) > self.lease:
+                self.reap()
+                continue
+            if status == "queued" and on_position:
+                position = self.position(job_id)
+                if position is not None and position != last_position:
+                    last_position = position
+                    await on_position(position)
+            if deadline and loop.time() > deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(poll_interval)
+
+    def next_job(self, timeout=1, worker=""):
+        popped = self.redis.blpop([f"{self.prefix}:queue"], timeout=timeout)
+        if popped is None:
+            return None
+        job_id = popped[1]
+        job = self.redis.hgetall(self._job_key(job_id))
+        if not job:
+            return None
+        started = time.time()
+        self.redis.hset(self._job_key(job_id), mapping={
+            "status": "running",
+            "started": started,
+            "worker": worker,
+            "heartbeat": started,
+        })
+        self.redis.hset(f"{self.prefix}:running", job_id, started)
+        METRICS.observe("queue_wait_seconds", started - float(job["created"]), kind=job["kind"])
+        return job_id, job["kind"], json.loads(job["payload"])
+
+    def heartbeat(self, job_id):
+        now = time.time()
+        self.redis.hset(self._job_key(job_id), "heartbeat", now)
+        self.redis.hset(f"{self.prefix}:running", job_id, now)
+
+    def reap(self, worker=None):
+        # Fails running jobs whose lease ran out, or every running job of
+        # worker (one that was just terminated), and frees their inflight keys.
+        reaped = []
+        for job_id, heartbeat in self.redis.hgetall(f"{self.prefix}:running").items():
+            if worker is not None:
+                if self.redis.hget(self._job_key(job_id), "worker") != worker:
+                    continue
+            elif time.time() - float(heartbeat) <= self.lease:
+                continue
+            if self.redis.exists(self._job_key(job_id)):
+                self.finish(job_id, error="A pesquisa foi interrompida")
+            else:
+                self.redis.hdel(f"{self.prefix}:running", job_id)
+            reaped.append(job_id)
+        if reaped:
+            logger.warning(f"Failed {len(reaped)} running jobs whose worker stopped: {reaped}")
+        return reaped
+
+    def publish(self, job_id, page, batch):
+        key = f"{self._job_key(job_id)}:batches"
+        self.redis.rpush(key, json.dumps({"page": page, "rows": pack_rows(batch)}, separators=(",", ":")))
+        self.redis.expire(key, self.result_ttl)
+
+    def finish(self, job_id, error=None):
+        key = self._job_key(job_id)
+        inflight_key = self.redis.hget(key, "inflight_key")
+        self.redis.hset(key, mapping={
+            "status": "failed" if error else "done",
+            "error": error or "",
+            "finished": time.time(),
+        })
+        self.redis.expire(key, self.result_ttl)
+        self.redis.hdel(f"{self.prefix}:running", job_id)
+        if inflight_key and self.redis.get(inflight_key) == job_id:
+            self.redis.delete(inflight_key)
+
+    def report_worker(self, index, stats):
+        self.redis.hset(f"{self.prefix}:workers", str(index), json.dumps(stats))
+
+    def worker_stats(self):
+        return {int(k): json.loads(v) for k, v in self.redis.hgetall(f"{self.prefix}:workers").items()}
+
+    def report_metrics(self, index, snapshot):
+        self.redis.hset(f"{self.prefix}:metrics", str(index), json.dumps(snapshot))
+
+    def worker_metrics(self):
+        return [json.loads(v) for v in self.redis.hgetall(f"{self.prefix}:metrics").values()]
@@ -0,0 +1,73 @@
+import importlib.util
+import json
+from utils import parse_price
+
+# Field order of a packed row. price_value goes last so rows cached before it
+# existed (seven fields) still unpack; it is then parsed from the price text.
+FIELDS = ("title", "price", "location", "link", "area", "bedrooms", "bathrooms", "price_value")
+
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+if HAS_MSGPACK:
+    import msgpack
+
+class Listing:
+    # One listing is kept for every card of a crawl and every cached result,
+    # so slots instead of a per-instance dict. Display text (price, location)
+    # sits next to the typed numbers used for filtering and sorting.
+    __slots__ = FIELDS
+
+    def __init__(self, title, price, location=None, link=None, area=None, bedrooms=None, bathrooms=None,
+                 price_value=None):
+        self.title = title
+        self.price = price
+        self.location = location
+        self.link = link
+        self.area = area
+        self.bedrooms = bedrooms
+        self.bathrooms = bathrooms
+        self.price_value = price_value if price_value is not None else parse_price(price)
+
+    def __eq__(self, other):
+        return isinstance(other, Listing) and self.to_row() == other.to_row()
+
+    def __hash__(self):
+        return hash(self.link)
+
+    def __repr__(self):
+        return f"Listing({self.title!r}, {self.price!r}, link={self.link!r})"
+
+    def to_row(self):
+        return [self.title, self.price, self.location, self.link, self.area, self.bedrooms, self.bathrooms,
+                self.price_value]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def to_dict(self):
+        return dict(zip(FIELDS, self.to_row()))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{f: data[f] for f in FIELDS if f in data})
+
+def pack_rows(listings):
+    return [listing.to_row() for listing in listings]
+
+def unpack_rows(rows):
+    return [Listing(*row) for row in rows]
+
+def dumps(listings, fmt="json"):
+    # "json" gives text (Redis clients with decode_responses), "msgpack" bytes.
+    if fmt == "msgpack":
+        if not HAS_MSGPACK:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb(pack_rows(listings), use_bin_type=True)
+    return json.dumps(pack_rows(listings), separators=(",", ":"), ensure_ascii=False)
+
+def loads(data, fmt="json"):
+    if fmt == "msgpack":
+        if not HAS_MSGPACK:
+            raise RuntimeError("msgpack is not installed")
+        return unpack_rows(msgpack.unpackb(data, raw=False))
+    return unpack_rows(json.loads(data))
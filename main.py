@@ -1,19 +1,39 @@
 import os
 import logging
 import asyncio
-import redis
+import time
 from datetime import datetime
-import concurrent.futures
 from telegram import Update, InputFile
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ContextTypes, filters
 from dotenv import load_dotenv
-from utils import extract_intent_from_text, format_filters, generate_pdf_report
-from scraper import scrape_casayes
+from utils import format_filters
+from reports import REPORT_CACHE, export_report
+from intent import extract_intent_from_text, extract_report_format
+from scraper import MAX_LISTINGS
+from cache import ResultCache, filters_key
+from async_scraper import iter_casayes, scrape_casayes, with_deadline
+from jobs import ScrapeQueue, make_redis
+from store import ListingStore
+from worker import WorkerPool, run_crawl
+from metrics import METRICS, Metrics, start_metrics_server
+from watches import TooManyWatches, WatchList
+from config import (
+    RESULT_CACHE_TTL, RESULT_CACHE_STALE_TTL, SNAPSHOT_DB_PATH, SNAPSHOT_MAX_AGE, SNAPSHOT_CRAWL_INTERVAL,
+    SNAPSHOT_FULL_CRAWL_EVERY, PROGRESS_UPDATE_INTERVAL,
+    JOB_WORKERS, JOB_QUEUE_MAX, JOB_RATE_LIMIT, JOB_RATE_WINDOW, JOB_RESULT_TTL, JOB_LEASE, METRICS_PORT, METRICS_HOST,
+    WATCH_INTERVAL, WATCH_CHECK_INTERVAL, WATCH_MAX_PER_CHAT, WATCH_ALERT_LISTINGS, WATCH_MAX_DEFERRALS
+)
 
 load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
 REDIS_URL = os.getenv("REDIS_URL")
-REDIS = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+REDIS = make_redis(REDIS_URL)
+JOBS = ScrapeQueue(REDIS, max_queued=JOB_QUEUE_MAX, rate_limit=JOB_RATE_LIMIT,
+                   rate_window=JOB_RATE_WINDOW, result_ttl=JOB_RESULT_TTL, lease=JOB_LEASE)
+WORKERS = WorkerPool(REDIS_URL, JOB_WORKERS)
+RESULT_CACHE = ResultCache(REDIS, ttl=RESULT_CACHE_TTL, stale_ttl=RESULT_CACHE_STALE_TTL)
+STORE = ListingStore(SNAPSHOT_DB_PATH)
+WATCHES = WatchList(REDIS, max_per_chat=WATCH_MAX_PER_CHAT)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,21 +42,138 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# With JOB_WORKERS=0 the bot scrapes on its own event loop with the async
+# scraper instead of queueing jobs; these are its in-flight background tasks.
+LOCAL_TASKS = {}
+
+async def refresh_locally(filters):
+    try:
+        RESULT_CACHE.set(filters, await asyncio.wait_for(scrape_casayes(filters), timeout=1800))
+    except Exception as e:
+        logger.warning(f"Background refresh failed for {filters}: {e}")
+
+def run_in_background(key, coro):
+    if key in LOCAL_TASKS:
+        coro.close()
+        return
+    task = asyncio.get_running_loop().create_task(coro)
+    LOCAL_TASKS[key] = task
+    task.add_done_callback(lambda _: LOCAL_TASKS.pop(key, None))
+
+def refresh_in_background(filters):
+    # Workers write finished searches to the result cache, and the queue joins
+    # this job with any identical search already in flight.
+    logger.info(f"Serving stale results, refreshing in background: {filters}")
+    if not JOB_WORKERS:
+        run_in_background(filters_key(filters), refresh_locally(filters))
+        return
+    try:
+        JOBS.submit(filters)
+    except Exception as e:
+        logger.warning(f"Background refresh not queued for {filters}: {e}")
+
+async def search_stream(filters, user_id=None, on_position=None):
+    if STORE.is_fresh(SNAPSHOT_MAX_AGE):
+        yield None, STORE.query(filters, max_age=SNAPSHOT_MAX_AGE, limit=MAX_LISTINGS)
+        return
+
+    results, fresh = RESULT_CACHE.get(filters)
+    if results is not None:
+        if not fresh:
+            refresh_in_background(filters)
+        yield None, results
+        return
+
+    if not JOB_WORKERS:
+        # A timeout cancels the scrape itself, closing its browser or connections.
+        results = []
+        async for page_number, batch in with_deadline(iter_casayes(filters), 1800):
+            results.extend(batch)
+            yield page_number, batch
+        RESULT_CACHE.set(filters, results)
+        return
+
+    job_id = JOBS.submit(filters, user_id=user_id)
+    async for page_number, batch in JOBS.follow(job_id, on_position=on_position, timeout=1800):
+        yield page_number, batch
+
+def format_preview(results, title):
+    preview = f"{title.format(n=len(results))}\n\n"
+    for i, r in enumerate(results, 1):
+        preview += f"🔹 *{r.title}*\n"
+        preview += f"   📍 {r.location}\n"
+        preview += f"   💶 {r.price}\n"
+        if r.area:
+            preview += f"   📐 {r.area} m²\n"
+        if r.bedrooms is not None:
+            preview += f"   🛏️ {r.bedrooms} quartos\n"
+        if r.bathrooms is not None:
+            preview += f"   🛁 {r.bathrooms} WC\n"
+        if r.link:
+            preview += f"   🔗 [Ver imóvel]({r.link})\n"
+        preview += "\n"
+    return preview
+
+async def stream_results(update, progress, filters, preview_title):
+    # Sends the top-5 preview as soon as the first matches arrive and keeps the
+    # progress message updated while the remaining pages are scraped.
+    results = []
+    preview_sent = False
+    started = last_progress = time.monotonic()
+    scraped = False
+
+    async def show_position(position):
+        try:
+            await progress.edit_text(f"📋 Posição na fila: {position}")
+        except Exception as e:
+            logger.debug(f"Failed to update progress message: {e}")
+
+    async for page_number, batch in search_stream(filters, update.effective_user.id, show_position):
+        results.extend(batch)
+        scraped = scraped or page_number is not None
+        if results and not preview_sent:
+            METRICS.observe("first_result_seconds", time.monotonic() - started)
+            preview = format_preview(results[:5], preview_title)
+            await update.message.reply_text(preview, parse_mode="Markdown", disable_web_page_preview=True)
+            preview_sent = True
+        if page_number and time.monotonic() - last_progress >= PROGRESS_UPDATE_INTERVAL:
+            last_progress = time.monotonic()
+            try:
+                await progress.edit_text(f"⏳ Página {page_number}: {len(results)} imóveis encontrados...")
+            except Exception as e:
+                logger.debug(f"Failed to update progress message: {e}")
+    METRICS.observe("search_seconds", time.monotonic() - started, source="scrape" if scraped else "cached")
+    return results
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🏡 *Bem-vindo ao Bot CasaYes!*\n\n"
         "Digite consultas como:\n"
         "- `T2 em Lisboa`\n"
-        "- `T3 com 2 WC`\n\n"
-        "✅ Filtros: localização, tipologia, preço, área, quartos, WC.\n\n"
+        "- `T3 com 2 WC`\n"
+        "- `T2 no Porto até 300 mil € em excel`\n\n"
+        "✅ Filtros: localização, tipologia, preço, área, quartos, WC.\n"
+        "📎 Relatório em PDF, ou CSV / Excel / JSON se pedir.\n\n"
         "Comandos:\n"
         "/test — Ver todos os imóveis\n"
+        "/watch `T2 em Lisboa até 300 mil €` — Receber novidades\n"
+        "/unwatch `n` — Deixar de seguir\n"
         "/pause — Pausar o bot\n"
         "/resume — Retomar\n"
         "/status — Ver status\n",
         parse_mode="Markdown"
     )
 
+async def send_report(update, results, filters=None, fmt="pdf"):
+    # Rendering is CPU-bound, so it runs in a thread; repeat PDFs come from
+    # the report cache.
+    document, filename = await asyncio.to_thread(export_report, results, filters, fmt)
+    with document:
+        await update.message.reply_document(
+            document=InputFile(document, filename=filename),
+            caption="📄 *Lista completa de imóveis*"
+        )
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if REDIS.get("paused"):
         await update.message.reply_text("🔴 Bot está pausado.")
@@ -44,17 +181,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     text = update.message.text
     filters = extract_intent_from_text(text)
-    logger.info(f"Parsed filters: {filters}")
+    report_format = extract_report_format(text)
+    logger.info(f"Parsed filters: {filters} (report: {report_format})")
 
     await update.message.reply_text(f"🔍 *A procurar imóveis...*\n{format_filters(filters)}", parse_mode="Markdown")
+    progress = await update.message.reply_text("⏳ A carregar resultados...")
 
-    loop = asyncio.get_event_loop()
     try:
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            results = await asyncio.wait_for(
-                loop.run_in_executor(pool, scrape_casayes, filters),
-                timeout=1800
-            )
+        results = await stream_results(update, progress, filters, "🏘 *Top {n} Imóveis Encontrados*")
     except asyncio.TimeoutError:
         logger.error("Search timed out after 60 seconds", exc_info=True)
         await update.message.reply_text("❌ A pesquisa falhou: Tempo limite esgotado.")
@@ -68,33 +202,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ *Nenhum imóvel encontrado:*\n{format_filters(filters)}")
         return
 
-    # Send top 5 preview
-    preview = f"🏘 *Top {min(5, len(results))} Imóveis Encontrados*\n\n"
-    for i, r in enumerate(results[:5], 1):
-        preview += f"🔹 *{r['title']}*\n"
-        preview += f"   📍 {r['location']}\n"
-        preview += f"   💶 {r['price']}\n"
-        if r.get('area'):
-            preview += f"   📐 {r['area']} m²\n"
-        if r.get('bedrooms') is not None:
-            preview += f"   🛏️ {r['bedrooms']} quartos\n"
-        if r.get('bathrooms') is not None:
-            preview += f"   🛁 {r['bathrooms']} WC\n"
-        if r.get('link'):
-            preview += f"   🔗 [Ver imóvel]({r['link']})\n"
-        preview += "\n"
-
-    await update.message.reply_text(preview, parse_mode="Markdown", disable_web_page_preview=True)
+    await progress.edit_text(f"✅ {len(results)} imóveis encontrados.")
 
-    # Generate PDF of full results
-    filename = generate_pdf_report(results, filters)
-    if os.path.exists(filename):
-        with open(filename, "rb") as pdf_file:
-            await update.message.reply_document(
-                document=InputFile(pdf_file, filename="imoveis.pdf"),
-                caption="📄 *Lista completa de imóveis*"
-            )
-        os.remove(filename)
+    # Full results in the format asked for, PDF by default
+    await send_report(update, results, filters, report_format)
 
     REDIS.set("last_scrape_time", datetime.now().isoformat())
 
@@ -103,14 +214,9 @@ async def test(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("🔴 Bot está pausado.")
         return
 
-    await update.message.reply_text("🔍 *A procurar imóveis... aguarde ⏳*", parse_mode="Markdown")
-    loop = asyncio.get_event_loop()
+    progress = await update.message.reply_text("🔍 *A procurar imóveis... aguarde ⏳*", parse_mode="Markdown")
     try:
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            results = await asyncio.wait_for(
-                loop.run_in_executor(pool, scrape_casayes, None),
-                timeout=1800
-            )
+        results = await stream_results(update, progress, None, "📊 *Top {n} Imóveis Encontrados:*")
     except asyncio.TimeoutError:
         await update.message.reply_text("❌ Tempo limite esgotado durante a pesquisa.")
         return
@@ -122,33 +228,10 @@ async def test(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ *Nenhum imóvel encontrado.*")
         return
 
-    # Preview top 5
-    msg = f"📊 *Top {min(5, len(results))} Imóveis Encontrados:*\n\n"
-    for i, r in enumerate(results[:5], 1):
-        msg += f"🔹 *{r['title']}*\n"
-        msg += f"   📍 {r['location']}\n"
-        msg += f"   💶 {r['price']}\n"
-        if r.get('area'):
-            msg += f"   📐 {r['area']} m²\n"
-        if r.get('bedrooms') is not None:
-            msg += f"   🛏️ {r['bedrooms']} quartos\n"
-        if r.get('bathrooms') is not None:
-            msg += f"   🛁 {r['bathrooms']} WC\n"
-        if r.get('link'):
-            msg += f"   🔗 [Ver imóvel]({r['link']})\n"
-        msg += "\n"
-
-    await update.message.reply_text(msg, parse_mode="Markdown", disable_web_page_preview=True)
+    await progress.edit_text(f"✅ {len(results)} imóveis encontrados.")
 
     # PDF
-    filename = generate_pdf_report(results)
-    if os.path.exists(filename):
-        with open(filename, "rb") as pdf_file:
-            await update.message.reply_document(
-                document=InputFile(pdf_file, filename="imoveis.pdf"),
-                caption="📄 *Lista completa de imóveis*"
-            )
-        os.remove(filename)
+    await send_report(update, results)
 
     REDIS.set("last_scrape_time", datetime.now().isoformat())
 
@@ -160,22 +243,199 @@ async def resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
     REDIS.delete("paused")
     await update.message.reply_text("▶ Bot retomado.")
 
+STATUS_TIMINGS = [
+    ("Espera na fila", "queue_wait_seconds", {"kind": "search"}),
+    ("Pesquisa", "search_seconds", {"source": "scrape"}),
+    ("1º resultado", "first_result_seconds", {}),
+    ("Navegação", "stage_seconds", {"stage": "navigate"}),
+    ("Extração", "stage_seconds", {"stage": "extract", "path": "bulk"}),
+    ("HTTP", "stage_seconds", {"stage": "http_fetch"}),
+    ("PDF", "stage_seconds", {"stage": "pdf_render"}),
+]
+
+def collect_metrics():
+    # Worker processes keep their own registries and publish them to Redis.
+    if WORKERS.use_threads or not JOB_WORKERS:
+        return METRICS
+    merged = Metrics()
+    merged.merge(METRICS.snapshot())
+    for snapshot in JOBS.worker_metrics():
+        merged.merge(snapshot)
+    return merged
+
+def format_timings(metrics):
+    lines = []
+    for label, name, labels in STATUS_TIMINGS:
+        quantiles = metrics.quantiles(name, **labels)
+        if quantiles:
+            lines.append(f"{label}: {quantiles[0.5]:.2f}s / {quantiles[0.95]:.2f}s")
+    return "\n".join(lines)
+
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     paused = REDIS.get("paused")
     last = REDIS.get("last_scrape_time")
+    workers = list(JOBS.worker_stats().values())
+    pool_jobs = sum(w['jobs'] for w in workers)
+    avg_wait = sum(w['avg_wait'] * w['jobs'] for w in workers) / pool_jobs if pool_jobs else 0.0
+    cache = RESULT_CACHE.stats()
+    last_crawl = STORE.last_crawl_time()
     msg = f"⚙️ *Status*\nPausado: {'Sim' if paused else 'Não'}\nÚltima Pesquisa: {last if last else 'Nunca'}"
+    msg += (
+        f"\n\n🌐 *Workers* ({JOB_WORKERS})\n"
+        f"Fila: {JOBS.queued()} | Browser hits: {sum(w['hits'] for w in workers)} | "
+        f"Misses: {sum(w['misses'] for w in workers)} | Reciclados: {sum(w['recycles'] for w in workers)}\n"
+        f"Espera por browser: média {avg_wait:.2f}s | máx {max((w['max_wait'] for w in workers), default=0.0):.2f}s"
+        f"\n\n🗄 *Cache*\n"
+        f"Hits: {cache['hits']} | Stale: {cache['stale_hits']} | Misses: {cache['misses']} | "
+        f"Relatórios: {REPORT_CACHE.hits} hits, {REPORT_CACHE.misses} misses"
+        f"\n\n📚 *Snapshot*\n"
+        f"Imóveis: {STORE.count()} | Último crawl: "
+        f"{datetime.fromtimestamp(last_crawl).isoformat(timespec='seconds') if last_crawl else 'Nunca'}"
+        f" | Pesquisas seguidas: {WATCHES.count()}"
+    )
+    timings = format_timings(collect_metrics())
+    if timings:
+        msg += f"\n\n⏱ *Tempos (p50 / p95)*\n{timings}"
     await update.message.reply_text(msg, parse_mode="Markdown")
 
+async def refresh_snapshot(context: ContextTypes.DEFAULT_TYPE):
+    # Cheap incremental crawls, with a full crawl every few runs to catch removals.
+    runs = context.job.data["runs"]
+    context.job.data["runs"] += 1
+    full = runs % SNAPSHOT_FULL_CRAWL_EVERY == 0
+    if not JOB_WORKERS:
+        run_in_background("crawl", asyncio.to_thread(run_crawl, STORE, None, full, WATCHES, RESULT_CACHE))
+        return
+    try:
+        JOBS.submit({"full": full}, kind="crawl")
+    except Exception as e:
+        logger.error(f"Snapshot crawl not queued: {str(e)}", exc_info=True)
+
+async def watch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    text = " ".join(context.args)
+    if not text:
+        watched = WATCHES.for_chat(chat_id)
+        if not watched:
+            await update.message.reply_text("👀 Não segue nenhuma pesquisa. Use /watch seguido da pesquisa.")
+            return
+        lines = [f"*{i}.* {format_filters(filters).replace(chr(10), ' | ')}" for i, (_, filters) in enumerate(watched, 1)]
+        await update.message.reply_text("👀 *Pesquisas seguidas*\n" + "\n".join(lines), parse_mode="Markdown")
+        return
+
+    filters = extract_intent_from_text(text)
+    if not any(value is not None for value in filters.values()):
+        await update.message.reply_text("❓ Indique pelo menos um filtro, por exemplo `/watch T2 em Lisboa`.",
+                                        parse_mode="Markdown")
+        return
+    try:
+        WATCHES.add(chat_id, filters)
+    except TooManyWatches as e:
+        await update.message.reply_text(f"❌ {e}. Use /unwatch para libertar uma.")
+        return
+    await update.message.reply_text(
+        f"👀 *A seguir:*\n{format_filters(filters)}\n\nVai receber imóveis novos e descidas ou subidas de preço.",
+        parse_mode="Markdown"
+    )
+
+async def unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("❓ Use /unwatch seguido do número da pesquisa (veja /watch).")
+        return
+    filters = WATCHES.remove(chat_id, int(context.args[0]))
+    if filters is None:
+        await update.message.reply_text("❌ Pesquisa não encontrada (veja /watch).")
+        return
+    await update.message.reply_text(f"🔕 Deixou de seguir:\n{format_filters(filters)}")
+
+def format_alert(filters, items):
+    alert = f"🔔 *Novidades na sua pesquisa*\n{format_filters(filters)}\n\n"
+    for listing, previous in items[:WATCH_ALERT_LISTINGS]:
+        alert += f"{'🆕' if previous is None else '💱'} *{listing.title}*\n"
+        alert += f"   📍 {listing.location}\n"
+        alert += f"   💶 {listing.price}" + (f" (antes {previous})" if previous is not None else "") + "\n"
+        if listing.link:
+            alert += f"   🔗 [Ver imóvel]({listing.link})\n"
+        alert += "\n"
+    if len(items) > WATCH_ALERT_LISTINGS:
+        alert += f"… e mais {len(items) - WATCH_ALERT_LISTINGS} imóveis. Envie a pesquisa para ver todos."
+    return alert
+
+async def deliver_alerts(context):
+    for key, items in WATCHES.pop_alerts():
+        filters = WATCHES.filters(key)
+        if filters is None:
+            continue
+        alert = format_alert(filters, items)
+        for chat_id in WATCHES.chats(key):
+            try:
+                await context.bot.send_message(chat_id, alert, parse_mode="Markdown", disable_web_page_preview=True)
+            except Exception as e:
+                logger.warning(f"Alert not delivered to chat {chat_id}: {e}")
+
+def crawl_watches(context):
+    # One incremental crawl serves every watched search: run_crawl matches
+    # its delta against them and queues the alerts. Snapshot crawls do the
+    # same, so this only crawls when none ran in the last WATCH_INTERVAL, and
+    # waits a few ticks while people have searches in the queue.
+    if SNAPSHOT_CRAWL_INTERVAL and SNAPSHOT_CRAWL_INTERVAL <= WATCH_INTERVAL:
+        return
+    data = context.job.data
+    last = max(STORE.last_crawl_time() or 0, data["submitted"])
+    if time.time() - last < WATCH_INTERVAL:
+        return
+    if JOB_WORKERS and JOBS.queued() and data["deferred"] < WATCH_MAX_DEFERRALS:
+        data["deferred"] += 1
+        logger.info(f"Watch crawl deferred: {JOBS.queued()} searches queued")
+        return
+    data["deferred"] = 0
+    data["submitted"] = time.time()
+    if not JOB_WORKERS:
+        run_in_background("crawl", asyncio.to_thread(run_crawl, STORE, None, False, WATCHES, RESULT_CACHE))
+        return
+    try:
+        # Joins a snapshot crawl already in flight.
+        JOBS.submit({"full": False}, kind="crawl")
+    except Exception as e:
+        logger.error(f"Watch crawl not queued: {str(e)}", exc_info=True)
+
+async def check_watches(context: ContextTypes.DEFAULT_TYPE):
+    if REDIS.get("paused") or not WATCHES.count():
+        return
+    await deliver_alerts(context)
+    crawl_watches(context)
+
+async def post_init(application):
+    WORKERS.start()
+    if METRICS_PORT:
+        application.bot_data["metrics_server"] = start_metrics_server(
+            METRICS_PORT, METRICS_HOST, lambda: collect_metrics().render()
+        )
+
+async def shutdown(application):
+    server = application.bot_data.pop("metrics_server", None)
+    if server is not None:
+        server.shutdown()
+    await asyncio.get_running_loop().run_in_executor(None, WORKERS.stop)
+
 async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("❓ Comando desconhecido.")
 
 if __name__ == '__main__':
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_init(post_init).post_shutdown(shutdown).build()
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("test", test))
     app.add_handler(CommandHandler("pause", pause))
     app.add_handler(CommandHandler("resume", resume))
     app.add_handler(CommandHandler("status", status))
+    app.add_handler(CommandHandler("watch", watch))
+    app.add_handler(CommandHandler("unwatch", unwatch))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message))
     app.add_handler(MessageHandler(filters.COMMAND, unknown))
+    if SNAPSHOT_CRAWL_INTERVAL:
+        app.job_queue.run_repeating(refresh_snapshot, interval=SNAPSHOT_CRAWL_INTERVAL, first=10, data={"runs": 0})
+    if WATCH_INTERVAL:
+        app.job_queue.run_repeating(check_watches, interval=WATCH_CHECK_INTERVAL, first=WATCH_CHECK_INTERVAL,
+                                    data={"submitted": 0, "deferred": 0})
     asyncio.run(app.run_polling())
\ No newline at end of file
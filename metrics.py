@@ -0,0 +1,164 @@
+import cProfile
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_SAMPLES, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "casayes"
+QUANTILES = (0.5, 0.95)
+
+# Counters and timings keyed by (name, labels). Timings keep all-time count
+# and sum plus a window of the last METRICS_SAMPLES observations, so quantiles
+# follow recent traffic. Worker processes publish snapshot() through Redis and
+# the bot merges them with its own before exporting.
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def quantile(samples, q):
+    # Nearest-rank.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+class Metrics:
+    def __init__(self, samples=METRICS_SAMPLES):
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._timings = {}
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _labels_key(labels))] += value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = [0, 0.0, deque(maxlen=self.samples)]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2].append(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stage(self, stage, **labels):
+        return self.timer("stage_seconds", stage=stage, **labels)
+
+    def quantiles(self, name, **labels):
+        with self._lock:
+            timing = self._timings.get((name, _labels_key(labels)))
+            samples = list(timing[2]) if timing else []
+        return {q: quantile(samples, q) for q in QUANTILES} if samples else None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "timings": [[name, list(labels), count, total, [round(s, 4) for s in samples]]
+                            for (name, labels), (count, total, samples) in self._timings.items()],
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for name, labels, value in snapshot["counters"]:
+                self._counters[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, count, total, samples in snapshot["timings"]:
+                key = (name, tuple(map(tuple, labels)))
+                timing = self._timings.get(key)
+                if timing is None:
+                    timing = self._timings[key] = [0, 0.0, deque(maxlen=self.samples)]
+                timing[0] += count
+                timing[1] += total
+                timing[2].extend(samples)
+
+    def render(self):
+        # Prometheus text exposition format: counters, and timings as summaries.
+        lines = []
+        snapshot = self.snapshot()
+        by_name = defaultdict(list)
+        for name, labels, value in snapshot["counters"]:
+            by_name[name].append((labels, value))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for labels, value in by_name[name]:
+                lines.append(f"{PREFIX}_{name}_total{_format_labels(labels)} {value:g}")
+
+        by_name = defaultdict(list)
+        for name, labels, count, total, samples in snapshot["timings"]:
+            by_name[name].append((labels, count, total, samples))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {PREFIX}_{name} summary")
+            for labels, count, total, samples in by_name[name]:
+                for q in QUANTILES if samples else ():
+                    lines.append(f"{PREFIX}_{name}{_format_labels(labels + [('quantile', q)])} {quantile(samples, q):g}")
+                lines.append(f"{PREFIX}_{name}_sum{_format_labels(labels)} {total:g}")
+                lines.append(f"{PREFIX}_{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+METRICS = Metrics()
+
+def start_metrics_server(port, host="127.0.0.1", collect=None):
+    # collect() returns the exposition text; defaults to this process only.
+    collect = collect or METRICS.render
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = collect().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+def profile_path(name, suffix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.{suffix}")
+
+@contextmanager
+def profiled(name):
+    # With PROFILE_DIR set, every run is profiled and dumped for
+    # `python -m pstats` or snakeviz. cProfile only sees the calling thread.
+    if not PROFILE_DIR:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = profile_path(name, "prof")
+        profiler.dump_stats(path)
+        logger.info(f"Profile written to {path}")
@@ -0,0 +1,53 @@
+import re
+from urllib.parse import urlencode
+from unidecode import unidecode
+from config import SEARCH_LOCATION_SLUGS
+
+SEARCH_PATH = "/pt/comprar/casaseapartamentos"
+
+# Filter key -> CasaYes search query parameter. Filters not listed here (and
+# location, which becomes a path segment) can only be checked locally.
+# Only locations in SEARCH_LOCATION_SLUGS become a path segment; any other
+# slug may have no page on the site.
+PUSHDOWN_PARAMS = {
+    "typology": "tipologia",
+    "min_price": "precoMin",
+    "max_price": "precoMax",
+    "area_min": "areaMin",
+    "area_max": "areaMax",
+    "bedrooms": "quartos",
+}
+
+def location_slug(location):
+    return re.sub(r"[^a-z0-9]+", "-", unidecode(location).lower()).strip("-")
+
+def known_location(location):
+    return location_slug(location) in SEARCH_LOCATION_SLUGS
+
+def plan_search(filters=None, pushdown=True):
+    plan = {"path": SEARCH_PATH, "params": {}, "pushed": [], "local": []}
+    if not filters:
+        return plan
+
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            # The site takes one value per parameter; sets are matched locally.
+            plan["local"].append(key)
+        elif pushdown and key == "location" and known_location(value):
+            plan["path"] = f"{SEARCH_PATH}/{location_slug(value)}"
+            plan["pushed"].append(key)
+        elif pushdown and key in PUSHDOWN_PARAMS:
+            plan["params"][PUSHDOWN_PARAMS[key]] = str(value).lower() if key == "typology" else value
+            plan["pushed"].append(key)
+        else:
+            plan["local"].append(key)
+    return plan
+
+def search_url(base_url, plan, page_number=1, page_param="page"):
+    params = dict(plan["params"])
+    if page_number > 1:
+        params[page_param] = page_number
+    url = f"{base_url}{plan['path']}"
+    return f"{url}?{urlencode(params)}" if params else url
@@ -0,0 +1,291 @@
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.lib.colors import black, gray
+from reportlab.lib.units import cm
+from cache import canonical_filters
+from listing import FIELDS, pack_rows
+from utils import format_filters
+from metrics import METRICS
+from config import REPORT_CACHE_SIZE, REPORT_CHUNK_ROWS, REPORT_SPOOL_MAX_BYTES
+
+HAS_XLSX = importlib.util.find_spec("xlsxwriter") is not None
+if HAS_XLSX:
+    import xlsxwriter
+
+logger = logging.getLogger(__name__)
+
+# Styles are built once at import instead of per report.
+STYLES = getSampleStyleSheet()
+TITLE_STYLE = ParagraphStyle(
+    'Title',
+    parent=STYLES['Heading1'],
+    fontSize=14,
+    leading=18,
+    alignment=TA_CENTER,
+    spaceAfter=12,
+    textColor=black
+)
+SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    parent=STYLES['Normal'],
+    fontSize=9,
+    leading=11,
+    alignment=TA_CENTER,
+    spaceAfter=10,
+    textColor=gray
+)
+BODY_STYLE = ParagraphStyle(
+    'Body',
+    parent=STYLES['Normal'],
+    fontSize=8,
+    leading=10,
+    alignment=TA_LEFT,
+    spaceAfter=6,
+    spaceBefore=6
+)
+WRAP_STYLE = ParagraphStyle(
+    'Wrap',
+    parent=BODY_STYLE,
+    fontSize=8,
+    leading=10,
+    alignment=TA_LEFT,
+    spaceAfter=6,
+    spaceBefore=6,
+    wordWrap='LTR'
+)
+
+CSV_CHUNK_ROWS = 1000
+
+TABLE_HEADER = ['Título', 'Localização', 'Preço', 'Área', 'Quartos', 'WC', 'Link']
+COL_WIDTHS = [8*cm, 3*cm, 2.2*cm, 2*cm, 1.5*cm, 1.5*cm, 2.5*cm]
+BODY_TABLE_STYLE = [
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 0.5, black),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+]
+FIRST_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), gray),
+    ('TEXTCOLOR', (0, 0), (-1, 0), black),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+] + BODY_TABLE_STYLE)
+CHUNK_TABLE_STYLE = TableStyle(BODY_TABLE_STYLE)
+
+def listing_row(item):
+    link = f"<link href='{item.link}' color='blue'>Ver imóvel</link>" if item.link else '-'
+    return [
+        Paragraph(item.title or '-', WRAP_STYLE),
+        Paragraph(item.location or '-', WRAP_STYLE),
+        item.price or '-',
+        f"{item.area} m²" if item.area else '-',
+        str(item.bedrooms) if item.bedrooms is not None else '-',
+        str(item.bathrooms) if item.bathrooms is not None else '-',
+        Paragraph(link, WRAP_STYLE)
+    ]
+
+def table_chunks(listings, size=REPORT_CHUNK_ROWS):
+    # Stacked tables of `size` rows read as one table, like the single table
+    # reports used to have (header on the first page only), but ReportLab only
+    # ever lays out and splits one small table at a time.
+    rows = [TABLE_HEADER]
+    style = FIRST_TABLE_STYLE
+    for item in listings:
+        rows.append(listing_row(item))
+        if len(rows) >= size:
+            yield Table(rows, colWidths=COL_WIDTHS, style=style)
+            rows, style = [], CHUNK_TABLE_STYLE
+    if rows:
+        yield Table(rows, colWidths=COL_WIDTHS, style=style)
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    # build() consumes a list of flowables; filterFlowables runs before each
+    # one, so the list is topped up from an iterator whenever it is about to
+    # run dry. Only the chunk being laid out is held in memory.
+    def __init__(self, filename, pending, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._pending = pending
+        self._flowables = None
+
+    def build(self, flowables, **kwargs):
+        self._flowables = flowables
+        super().build(flowables, **kwargs)
+
+    def filterFlowables(self, flowables):
+        # Also called for ReportLab's internal page-start list; leave that alone.
+        if flowables is self._flowables and len(flowables) <= 1:
+            following = next(self._pending, None)
+            if following is not None:
+                flowables.append(following)
+
+def render_pdf_report(listings, filters=None, out=None, generated=None):
+    # out is a path or a binary file object; without one the PDF is returned
+    # as bytes. generated is the "Gerado em" text, now by default.
+    target = out or io.BytesIO()
+    doc = StreamingDocTemplate(
+        target,
+        table_chunks(listings),
+        pagesize=A4,
+        rightMargin=1.5*cm,
+        leftMargin=1.5*cm,
+        topMargin=2*cm,
+        bottomMargin=1.5*cm
+    )
+
+    elements = []
+    elements.append(Spacer(1, 24))
+    elements.append(Paragraph("Relatório de Imóveis - CasaYes", TITLE_STYLE))
+    generated = generated or datetime.now().strftime('%d/%m/%Y %H:%M')
+    elements.append(Paragraph(f"Gerado em {generated}", SUBTITLE_STYLE))
+    if filters:
+        elements.append(Paragraph("Filtros Aplicados:", SUBTITLE_STYLE))
+        elements.append(Paragraph(format_filters(filters).replace('\n', '<br/>'), BODY_STYLE))
+    elements.append(Spacer(1, 12))
+
+    doc.build(elements)
+    return target.getvalue() if out is None else out
+
+def generate_pdf_report(data, filters=None, filename=None):
+    if not filename:
+        filename = os.path.join(tempfile.gettempdir(), f"imoveis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+    return render_pdf_report(data, filters, filename)
+
+def generate_fallback_txt(data):
+    filename = os.path.join(tempfile.gettempdir(), f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    with open(filename, "w", encoding="utf-8") as f:
+        for item in data:
+            f.write(f"{item.title} — {item.price}\n")
+            f.write(f"{item.location}")
+            if item.area:
+                f.write(f" | {item.area} m²")
+            if item.bedrooms is not None:
+                f.write(f" | Quartos: {item.bedrooms}")
+            if item.bathrooms is not None:
+                f.write(f" | Casas de banho: {item.bathrooms}")
+            f.write(f"\nLink: {item.link}\n\n")
+    return filename
+
+def report_key(kind, listings, filters=None):
+    payload = json.dumps([kind, canonical_filters(filters), pack_rows(listings)], separators=(",", ":"),
+                         ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class ReportCache:
+    # Rendered reports by result set, least recently used evicted first.
+    # Popular searches served from the snapshot or result cache return the
+    # same listings, so their report is rendered once.
+    def __init__(self, size=REPORT_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        data = render()
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+REPORT_CACHE = ReportCache()
+
+def timed_render(listings, filters, generated):
+    with METRICS.stage("pdf_render"):
+        return render_pdf_report(listings, filters, generated=generated)
+
+def pdf_report(listings, filters=None):
+    # Blocking; the bot runs it with asyncio.to_thread. Cached reports carry
+    # the day they were rendered, which is part of the key, so a hit never
+    # shows an earlier date.
+    generated = datetime.now().strftime('%d/%m/%Y')
+    return REPORT_CACHE.get_or_render(
+        report_key(f"pdf:{generated}", listings, filters),
+        lambda: timed_render(listings, filters, generated)
+    )
+
+# Data exports for people who want to sort and filter the results themselves.
+# They write straight into the upload buffer, which only spills to disk past
+# REPORT_SPOOL_MAX_BYTES, and cost a fraction of a PDF.
+
+def export_csv(listings, filters, out):
+    # Rows are encoded a chunk at a time: TextIOWrapper can't wrap a
+    # SpooledTemporaryFile before Python 3.11. utf-8-sig so Excel picks up
+    # the accents.
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(FIELDS)
+    rows = pack_rows(listings)
+    encoding = "utf-8-sig"
+    for start in range(0, max(len(rows), 1), CSV_CHUNK_ROWS):
+        writer.writerows(rows[start:start + CSV_CHUNK_ROWS])
+        out.write(text.getvalue().encode(encoding))
+        encoding = "utf-8"
+        text.seek(0)
+        text.truncate()
+
+def export_jsonl(listings, filters, out):
+    for listing in listings:
+        out.write(json.dumps(listing.to_dict(), ensure_ascii=False).encode("utf-8"))
+        out.write(b"\n")
+
+def export_xlsx(listings, filters, out):
+    workbook = xlsxwriter.Workbook(out, {"in_memory": True})
+    sheet = workbook.add_worksheet("Imóveis")
+    bold = workbook.add_format({"bold": True})
+    sheet.write_row(0, 0, FIELDS, bold)
+    for row, listing in enumerate(listings, 1):
+        sheet.write_row(row, 0, listing.to_row())
+    sheet.autofilter(0, 0, len(listings), len(FIELDS) - 1)
+    sheet.freeze_panes(1, 0)
+    workbook.close()
+
+def export_pdf(listings, filters, out):
+    out.write(pdf_report(listings, filters))
+
+EXPORTERS = {
+    "pdf": export_pdf,
+    "csv": export_csv,
+    "jsonl": export_jsonl,
+}
+if HAS_XLSX:
+    EXPORTERS["xlsx"] = export_xlsx
+
+def export_report(listings, filters=None, fmt="pdf"):
+    # Returns (file object positioned at the start, upload filename). The
+    # caller closes the file.
+    if fmt not in EXPORTERS:
+        logger.warning(f"Report format {fmt} unavailable, sending PDF")
+        fmt = "pdf"
+    out = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_BYTES)
+    with METRICS.stage("report", format=fmt):
+        EXPORTERS[fmt](listings, filters, out)
+    METRICS.count("reports", format=fmt)
+    out.seek(0)
+    return out, f"imoveis.{fmt}"
@@ -0,0 +1,78 @@
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+from config import BLOCK_RESOURCE_TYPES, BLOCK_DOMAINS, ALLOW_DOMAINS
+
+logger = logging.getLogger(__name__)
+
+# Blocked requests are never downloaded, so savings are estimated from typical
+# sizes per resource type on listing pages.
+ESTIMATED_BYTES = {
+    "image": 120_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 30_000,
+    "stylesheet": 20_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+def domain_matches(host, domains):
+    return any(host == d or host.endswith(f".{d}") for d in domains)
+
+class ResourceBlocker:
+    # Allow rules win over deny rules, so a domain can be exempted from a
+    # blocked resource type (e.g. a CDN serving card data as "fetch").
+    def __init__(self, blocked_types=BLOCK_RESOURCE_TYPES, blocked_domains=BLOCK_DOMAINS, allowed_domains=ALLOW_DOMAINS):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = list(blocked_domains)
+        self.allowed_domains = list(allowed_domains)
+        self.allowed = 0
+        self.blocked = Counter()
+        self.estimated_bytes_saved = 0
+
+    def should_block(self, resource_type, url):
+        host = urlparse(url).hostname or ""
+        if domain_matches(host, self.allowed_domains):
+            return False
+        return resource_type in self.blocked_types or domain_matches(host, self.blocked_domains)
+
+    def _record(self, request):
+        if self.should_block(request.resource_type, request.url):
+            self.blocked[request.resource_type] += 1
+            self.estimated_bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            return True
+        self.allowed += 1
+        return False
+
+    def handle(self, route):
+        if self._record(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route):
+        if self._record(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def install(self, page):
+        page.route("**/*", self.handle)
+
+    async def install_async(self, page):
+        await page.route("**/*", self.handle_async)
+
+    def stats(self):
+        return {
+            "blocked": sum(self.blocked.values()),
+            "allowed": self.allowed,
+            "blocked_by_type": dict(self.blocked),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+        }
+
+    def log_summary(self):
+        stats = self.stats()
+        logger.info(
+            f"Blocked {stats['blocked']} of {stats['blocked'] + stats['allowed']} requests "
+            f"({stats['blocked_by_type']}), ~{stats['estimated_bytes_saved'] / 1_000_000:.1f} MB saved"
+        )
@@ -1,162 +1,559 @@
 from playwright.sync_api import sync_playwright, TimeoutError
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    SCRAPER_ENGINE, CASAYES_BASE_URL, HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_RETRIES, PAGE_CONCURRENCY,
+    CARDS_SETTLE_MS, CARDS_DEADLINE_MS, SEARCH_PUSHDOWN, PROFILE_DIR
+)
+from query_planner import plan_search, search_url
+from resource_blocking import ResourceBlocker
+from filter_engine import ListingFilter, compile_filters
+from listing import Listing
+from metrics import METRICS, profile_path
+from store import IncompleteCrawl
 from utils import parse_price
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
 import logging
+import requests
 import time
 
 logger = logging.getLogger(__name__)
 
-def scrape_casayes(filters=None):
-    logger.info(f"Scraping CasaYes with filters: {filters}")
-    listings = []
+MAX_PAGES = 50
+MAX_LISTINGS = 100  # Stop after collecting 100 matching listings
+MAX_SCRAPE_TIME = 900  # 15 minutes max scrape time
 
-    MAX_PAGES = 50
-    MAX_LISTINGS = 100  # Stop after collecting 100 matching listings
-    current_page = 1
-    start_time = time.time()
-    MAX_SCRAPE_TIME = 900  # 15 minutes max scrape time
+PAGE_PARAM = "page"
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0 Safari/537.36",
+    "Accept-Language": "pt-PT,pt;q=0.9",
+}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+CARD_SELECTOR = "div[data-id='listing-card-container']"
+TITLE_SELECTOR = "h2.text-base.font-extrabold"
+PRICE_SELECTOR = "h3.text-2xl.font-extrabold span"
+LOCATION_SELECTOR = "p.text-dark-neutral"
+LINK_SELECTOR = "a[data-id='listing-card-link']"
+STATS_SELECTOR = "div.mt-5 span"
+NEXT_BUTTON_SELECTOR = 'button[data-id="search-pagination-arrow-right-button"]'
+
+# Reads every field of every card in a single evaluate call, so a page costs
+# one round trip to the browser instead of a dozen per card.
+EXTRACT_CARDS_JS = """
+(cards, sel) => cards.map(card => {
+    const text = s => {
+        const el = card.querySelector(s);
+        return el ? el.innerText.trim() : null;
+    };
+    const link = card.querySelector(sel.link);
+    return {
+        visible: !!(card.offsetWidth || card.offsetHeight || card.getClientRects().length),
+        title: text(sel.title),
+        price_text: text(sel.price),
+        location: text(sel.location),
+        link: link ? link.getAttribute("href") : null,
+        stats: Array.from(card.querySelectorAll(sel.stats)).map(s => s.innerText.trim()),
+    };
+})
+"""
+
+# Scrolls to the bottom and resolves once the card count has not grown for
+# settleMs, re-scrolling whenever new cards appear, or when deadlineMs passes.
+WAIT_FOR_CARDS_JS = """
+({selector, settleMs, deadlineMs}) => new Promise(resolve => {
+    const count = () => document.querySelectorAll(selector).length;
+    let last = count();
+    let settle;
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(settle);
+        clearTimeout(deadline);
+        resolve(count());
+    };
+    const arm = () => {
+        clearTimeout(settle);
+        settle = setTimeout(finish, settleMs);
+    };
+    const observer = new MutationObserver(() => {
+        const current = count();
+        if (current > last) {
+            last = current;
+            window.scrollTo(0, document.body.scrollHeight);
+            arm();
+        }
+    });
+    observer.observe(document.body, {childList: true, subtree: true});
+    const deadline = setTimeout(finish, deadlineMs);
+    window.scrollTo(0, document.body.scrollHeight);
+    arm();
+})
+"""
+
+CARD_FIELD_SELECTORS = {
+    "title": TITLE_SELECTOR,
+    "price": PRICE_SELECTOR,
+    "location": LOCATION_SELECTOR,
+    "link": LINK_SELECTOR,
+    "stats": STATS_SELECTOR,
+}
+
+def round_trip(path="page"):
+    # Counted as each Playwright call is made, so failed tabs count only
+    # the calls they got to.
+    METRICS.count("browser_round_trips", path=path)
+
+def extract_cards(page):
+    round_trip("extract")
+    return page.eval_on_selector_all(CARD_SELECTOR, EXTRACT_CARDS_JS, CARD_FIELD_SELECTORS)
 
+def extract_cards_per_field(page):
+    # Legacy path: one locator call per field. Kept for benchmarking against extract_cards.
+    cards = page.locator(CARD_SELECTOR)
+    raw_cards = []
+    calls = 1
+    for i in range(cards.count()):
+        card = cards.nth(i)
+        calls += 1
         try:
-            page.goto("https://casayes.pt/pt/comprar/casaseapartamentos", timeout=30000)
-            page.wait_for_selector("div[data-id='listing-card-container']", timeout=30000)
+            if not card.is_visible():
+                raw_cards.append({"visible": False})
+                continue
+
+            title_el = card.locator(TITLE_SELECTOR)
+            price_el = card.locator(PRICE_SELECTOR)
+            location_el = card.locator(LOCATION_SELECTOR)
+            spans = card.locator(STATS_SELECTOR)
+            raw = {
+                "visible": True,
+                "title": title_el.inner_text(timeout=5000).strip() if title_el.count() else None,
+                "price_text": price_el.inner_text(timeout=5000).strip() if price_el.count() else None,
+                "location": location_el.inner_text(timeout=5000).strip() if location_el.count() else None,
+                "link": card.locator(LINK_SELECTOR).get_attribute("href"),
+                "stats": [spans.nth(j).inner_text(timeout=3000).strip() for j in range(min(spans.count(), 3))],
+            }
+            # Three counts, the link, the stats count, then one per text read.
+            calls += 5 + sum(raw[k] is not None for k in ("title", "price_text", "location")) + len(raw["stats"])
+            raw_cards.append(raw)
+        except Exception as e:
+            logger.warning(f"Error on card #{i+1}: {str(e)}")
+            raw_cards.append({"visible": False})
+    METRICS.count("browser_round_trips", calls, path="extract")
+    return raw_cards
+
+def parse_card(raw, i=0):
+    if not raw.get("visible"):
+        return None
+
+    title = raw.get("title")
+    if not title:
+        logger.debug(f"Card #{i+1} has no title, skipping.")
+        return None
+
+    price_text = raw.get("price_text")
+    if not price_text:
+        logger.warning(f"Card #{i+1} has no price text, skipping.")
+        return None
+
+    price = parse_price(price_text)
+    if price is None:
+        logger.warning(f"Failed to parse price '{price_text}' for card #{i+1}, skipping.")
+        return None
+
+    stats = raw.get("stats") or []
+    area = bedrooms = bathrooms = None
+    if len(stats) >= 1 and "m" in stats[0].lower():
+        area = int(''.join(filter(str.isdecimal, stats[0])))
+    if len(stats) >= 2:
+        bedrooms = int(stats[1]) if stats[1].isdigit() else None
+    if len(stats) >= 3:
+        bathrooms = int(stats[2]) if stats[2].isdigit() else None
 
-            while True:
-                # Check for max scrape time
-                if time.time() - start_time > MAX_SCRAPE_TIME:
-                    logger.warning(f"Scraping stopped: exceeded max scrape time of {MAX_SCRAPE_TIME} seconds")
-                    break
+    link_suffix = raw.get("link")
+    return Listing(
+        title=title,
+        price=price_text,
+        price_value=price,
+        location=raw.get("location"),
+        link=f"{CASAYES_BASE_URL}{link_suffix}" if link_suffix else None,
+        area=area,
+        bedrooms=bedrooms,
+        bathrooms=bathrooms
+    )
 
-                # Check for max listings
-                if len(listings) >= MAX_LISTINGS:
-                    logger.info(f"Reached max listings limit: {MAX_LISTINGS}")
-                    break
+def parse_page(raw_cards, filters=None):
+    # Takes a filter dict or an already compiled ListingFilter.
+    predicate = filters if isinstance(filters, ListingFilter) else compile_filters(filters)
+    listings = []
+    errors = 0
+    with METRICS.stage("parse_filter"):
+        for i, raw in enumerate(raw_cards):
+            try:
+                listing = parse_card(raw, i)
+                if listing is None or not predicate(listing, i):
+                    continue
+                listings.append(listing)
+            except Exception as e:
+                errors += 1
+                logger.warning(f"Error on card #{i+1}: {str(e)}")
+    METRICS.count("cards_seen", len(raw_cards))
+    METRICS.count("cards_kept", len(listings))
+    if errors:
+        METRICS.count("cards_errored", errors)
+    return listings
+
+def parse_cards_html(html):
+    soup = BeautifulSoup(html, HTML_PARSER)
+
+    def text(card, selector):
+        el = card.select_one(selector)
+        return el.get_text(" ", strip=True) if el else None
+
+    raw_cards = []
+    for card in soup.select(CARD_SELECTOR):
+        link = card.select_one(LINK_SELECTOR)
+        raw_cards.append({
+            "visible": not card.has_attr("hidden"),
+            "title": text(card, TITLE_SELECTOR),
+            "price_text": text(card, PRICE_SELECTOR),
+            "location": text(card, LOCATION_SELECTOR),
+            "link": link.get("href") if link else None,
+            "stats": [s.get_text(" ", strip=True) for s in card.select(STATS_SELECTOR)],
+        })
+    has_next = soup.select_one(f"{NEXT_BUTTON_SELECTOR}:not([disabled])") is not None
+    return raw_cards, has_next
+
+def pushed(plan):
+    return bool(plan and plan["pushed"])
+
+def page_url(page_number, plan=None):
+    return search_url(CASAYES_BASE_URL, plan or plan_search(), page_number, PAGE_PARAM)
+
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=Retry(total=HTTP_RETRIES, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        _session = requests.Session()
+        _session.headers.update(HTTP_HEADERS)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
 
-                logger.info(f"Scraping page {current_page}")
+WAIT_FOR_CARDS_ARGS = {
+    "selector": CARD_SELECTOR,
+    "settleMs": CARDS_SETTLE_MS,
+    "deadlineMs": CARDS_DEADLINE_MS,
+}
 
-                # Scroll to bottom
-                for _ in range(5):
-                    page.mouse.wheel(0, 1500)
-                    page.wait_for_timeout(1000)
+def wait_for_cards(page):
+    start = time.perf_counter()
+    round_trip()
+    count = page.evaluate(WAIT_FOR_CARDS_JS, WAIT_FOR_CARDS_ARGS)
+    logger.debug(f"{count} cards settled on page")
+    waited = time.perf_counter() - start
+    METRICS.observe("stage_seconds", waited, stage="wait_cards")
+    return waited
 
-                cards = page.locator("div[data-id='listing-card-container']")
-                count = cards.count()
-                logger.info(f"Cards found on page: {count}")
+def has_next_page(page):
+    next_btn = page.locator(NEXT_BUTTON_SELECTOR)
+    round_trip()
+    if not next_btn.count():
+        return False
+    round_trip()
+    return next_btn.is_enabled()
 
-                for i in range(count):
-                    card = cards.nth(i)
+def browse_pages(context, bulk=True, plan=None, max_pages=MAX_PAGES, first_page=1, strict=False):
+    # strict: an error past the first page raises IncompleteCrawl instead of
+    # ending pagination, so crawls don't mistake it for the last page.
+    # Page N is loaded straight from its URL, so up to PAGE_CONCURRENCY tabs
+    # navigate at once while earlier pages are being read, in page order.
+    tabs = deque()
+    next_page = first_page
+    total_wait = 0.0
+    # Routes go on each tab, not the context, so pooled contexts start every
+    # run with fresh counters.
+    blocker = ResourceBlocker()
+
+    def open_next():
+        nonlocal next_page
+        round_trip()
+        tab = context.new_page()
+        round_trip()
+        blocker.install(tab)
+        with METRICS.stage("navigate"):
+            round_trip()
+            response = tab.goto(page_url(next_page, plan), wait_until="commit", timeout=30000)
+        tabs.append((next_page, tab, response))
+        next_page += 1
+
+    # Playwright trace of the whole run, for `playwright show-trace`.
+    tracing = bool(PROFILE_DIR)
+    if tracing:
+        context.tracing.start(screenshots=True, snapshots=True)
+
+    try:
+        while next_page <= min(first_page + PAGE_CONCURRENCY - 1, max_pages):
+            open_next()
+
+        while tabs:
+            current_page, page, response = tabs.popleft()
+            logger.info(f"Scraping page {current_page}")
+            try:
+                with METRICS.stage("wait_selector"):
                     try:
-                        if not card.is_visible():
-                            continue
-
-                        title_el = card.locator("h2.text-base.font-extrabold")
-                        title = title_el.inner_text(timeout=5000).strip() if title_el.count() else None
-                        if not title:
-                            logger.debug(f"Card #{i+1} has no title, skipping.")
-                            continue
-
-                        price_el = card.locator("h3.text-2xl.font-extrabold span")
-                        price_text = price_el.inner_text(timeout=5000).strip() if price_el.count() else None
-                        if not price_text:
-                            logger.warning(f"Card #{i+1} has no price text, skipping.")
-                            continue
-
-                        location_el = card.locator("p.text-dark-neutral")
-                        location = location_el.inner_text(timeout=5000).strip() if location_el.count() else None
-
-                        link_suffix = card.locator("a[data-id='listing-card-link']").get_attribute("href")
-                        link = f"https://casayes.pt{link_suffix}" if link_suffix else None
-
-                        spans = card.locator("div.mt-5 span")
-                        area = bedrooms = bathrooms = None
-
-                        if spans.count() >= 1:
-                            area_text = spans.nth(0).inner_text(timeout=3000).strip()
-                            if "m" in area_text.lower():
-                                area = int(''.join(filter(str.isdigit, area_text)))
-                        if spans.count() >= 2:
-                            bed_text = spans.nth(1).inner_text(timeout=3000).strip()
-                            bedrooms = int(bed_text) if bed_text.isdigit() else None
-                        if spans.count() >= 3:
-                            bath_text = spans.nth(2).inner_text(timeout=3000).strip()
-                            bathrooms = int(bath_text) if bath_text.isdigit() else None
-
-                        price = parse_price(price_text)
-                        if price is None:
-                            logger.warning(f"Failed to parse price '{price_text}' for card #{i+1}, skipping.")
-                            continue
-
-                        # Log listing details before filtering
-                        logger.debug(f"Processing listing #{i+1}: title={title}, price={price}, location={location}, area={area}, bedrooms={bedrooms}, bathrooms={bathrooms}")
-
-                        # Apply filters
-                        if filters:
-                            if filters.get("typology") and filters["typology"].lower() not in title.lower():
-                                logger.debug(f"Filtered out #{i+1}: typology {filters['typology']} not in {title}")
-                                continue
-                            if filters.get("location") and location and filters["location"].lower() not in location.lower():
-                                logger.debug(f"Filtered out #{i+1}: location {filters['location']} not in {location}")
-                                continue
-                            if filters.get("min_price") and price < filters["min_price"]:
-                                logger.debug(f"Filtered out #{i+1}: price {price} < {filters['min_price']}")
-                                continue
-                            if filters.get("max_price") and price > filters["max_price"]:
-                                logger.debug(f"Filtered out #{i+1}: price {price} > {filters['max_price']}")
-                                continue
-                            if filters.get("area_min") and (not area or area < filters["area_min"]):
-                                logger.debug(f"Filtered out #{i+1}: area {area} < {filters['area_min']}")
-                                continue
-                            if filters.get("area_max") and area and area > filters["area_max"]:
-                                logger.debug(f"Filtered out #{i+1}: area {area} > {filters['area_max']}")
-                                continue
-                            if filters.get("bedrooms") is not None and bedrooms is not None and bedrooms != filters["bedrooms"]:
-                                logger.debug(f"Filtered out #{i+1}: bedrooms {bedrooms} != {filters['bedrooms']}")
-                                continue
-                            if filters.get("wc") is not None and bathrooms is not None and bathrooms != filters["wc"]:
-                                logger.debug(f"Filtered out #{i+1}: bathrooms {bathrooms} != {filters['wc']}")
-                                continue
-
-                        listings.append({
-                            "title": title,
-                            "price": price_text,
-                            "location": location,
-                            "link": link,
-                            "area": area,
-                            "bedrooms": bedrooms,
-                            "bathrooms": bathrooms
-                        })
-
-                    except Exception as e:
-                        logger.warning(f"Error on card #{i+1}: {str(e)}")
-
-                if current_page >= MAX_PAGES:
-                    logger.info(f"Reached max pages limit: {MAX_PAGES}")
-                    break
-
-                try:
-                    next_btn = page.locator('button[data-id="search-pagination-arrow-right-button"]')
-                    if next_btn.count() and next_btn.is_enabled():
-                        logger.info("➡️ Clicking Next page...")
-                        next_btn.click()
-                        current_page += 1
-                        page.wait_for_timeout(3000)
-                        time.sleep(0.5)  # Reduced delay to speed up scraping
-                        page.wait_for_selector("div[data-id='listing-card-container']", timeout=10000)
-                    else:
-                        logger.info("No Next button or it's disabled. Stopping pagination.")
-                        break
-                except Exception as e:
-                    logger.warning(f"Pagination error or end reached: {e}")
-                    break
+                        round_trip()
+                        page.wait_for_selector(CARD_SELECTOR, timeout=30000 if current_page == first_page else 10000)
+                    except TimeoutError:
+                        # A first page that loaded but never shows a card is a
+                        # search with no results, not a failure.
+                        if current_page != first_page or response is None or not response.ok:
+                            raise
+                        logger.info(f"No listing cards on page {current_page}, no results.")
+                        return
 
-        except Exception as e:
-            logger.error(f"Failed to load page: {str(e)}", exc_info=True)
-            raise
+                waited = wait_for_cards(page)
+                total_wait += waited
+                logger.info(f"Page {current_page} ready after {waited:.2f}s")
+
+                with METRICS.stage("extract", path="bulk" if bulk else "per_field"):
+                    raw_cards = extract_cards(page) if bulk else extract_cards_per_field(page)
+                with METRICS.stage("pagination"):
+                    has_next = has_next_page(page)
+            except Exception as e:
+                if current_page == first_page:
+                    logger.error(f"Failed to load page: {str(e)}", exc_info=True)
+                    raise
+                if strict:
+                    raise IncompleteCrawl(f"page {current_page}: {e}") from e
+                logger.warning(f"Pagination error or end reached: {e}")
+                return
+            finally:
+                round_trip()
+                page.close()
+
+            yield current_page, raw_cards
+
+            if current_page >= max_pages:
+                logger.info(f"Reached max pages limit: {max_pages}")
+                return
+            if not has_next:
+                logger.info("No Next button or it's disabled. Stopping pagination.")
+                return
+            if next_page <= max_pages:
+                open_next()
+    finally:
+        for _, tab, _ in tabs:
+            round_trip()
+            tab.close()
+        if tracing:
+            path = profile_path("trace", "zip")
+            context.tracing.stop(path=path)
+            logger.info(f"Playwright trace written to {path}")
+        logger.info(f"Spent {total_wait:.2f}s waiting for lazy-loaded cards")
+        blocker.log_summary()
+
+def playwright_pages(bulk=True, browser_pool=None, plan=None, max_pages=MAX_PAGES, first_page=1, strict=False):
+    if browser_pool is not None:
+        with browser_pool.checkout() as context:
+            yield from browse_pages(context, bulk, plan, max_pages, first_page, strict)
+        return
+
+    with sync_playwright() as p:
+        with METRICS.stage("browser_launch"):
+            browser = p.chromium.launch(headless=True)
+        try:
+            yield from browse_pages(browser.new_context(), bulk, plan, max_pages, first_page, strict)
         finally:
             browser.close()
 
-    total_time = time.time() - start_time
-    logger.info(f"Scraping completed: {len(listings)} listings found across {current_page - 1} pages in {total_time:.2f} seconds")
-    return listings
\ No newline at end of file
+def fetch_page(session, page_number, plan=None):
+    logger.info(f"Fetching page {page_number}")
+    with METRICS.stage("http_fetch"):
+        response = session.get(page_url(page_number, plan), timeout=HTTP_TIMEOUT)
+    if response.status_code == 404 and (page_number > 1 or pushed(plan)):
+        # Past the last page of results, or no such search on the site; None
+        # tells it apart from a page whose cards are rendered client-side.
+        return None, False
+    response.raise_for_status()
+    with METRICS.stage("html_parse"):
+        return parse_cards_html(response.text)
+
+def http_pages(bulk=True, browser_pool=None, plan=None, max_pages=MAX_PAGES, first_page=1, strict=False):
+    session = get_session()
+    executor = ThreadPoolExecutor(max_workers=PAGE_CONCURRENCY)
+    in_flight = deque()
+    next_page = first_page
+    needs_browser = False
+
+    def submit_next():
+        nonlocal next_page
+        in_flight.append((next_page, executor.submit(fetch_page, session, next_page, plan)))
+        next_page += 1
+
+    try:
+        while next_page <= min(first_page + PAGE_CONCURRENCY - 1, max_pages):
+            submit_next()
+
+        while in_flight:
+            current_page, future = in_flight.popleft()
+            try:
+                raw_cards, has_next = future.result()
+            except Exception as e:
+                # Like the browser path: earlier pages were already handed out,
+                # so an error further on ends the search instead of failing it.
+                if current_page == first_page:
+                    logger.error(f"Failed to load page: {str(e)}", exc_info=True)
+                    raise
+                if strict:
+                    raise IncompleteCrawl(f"page {current_page}: {e}") from e
+                logger.warning(f"Pagination error or end reached: {e}")
+                break
+
+            if not raw_cards:
+                # No cards in the static markup of the first page means they are
+                # rendered client-side; past it, or on a 404, we ran out. A
+                # pushed-down search is first retried unfiltered by scrape_pages.
+                needs_browser = current_page == first_page and raw_cards is not None and not pushed(plan)
+                break
+
+            yield current_page, raw_cards
+
+            if current_page >= max_pages:
+                logger.info(f"Reached max pages limit: {max_pages}")
+                break
+            if not has_next:
+                logger.info("No Next button or it's disabled. Stopping pagination.")
+                break
+            if next_page <= max_pages:
+                submit_next()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if needs_browser:
+        logger.info("No listing cards in static HTML, falling back to Playwright.")
+        yield from playwright_pages(bulk, browser_pool, plan, max_pages, first_page, strict)
+
+ENGINES = {
+    "http": http_pages,
+    "playwright": playwright_pages,
+}
+
+def card_links(raw_cards):
+    return {raw.get("link") for raw in raw_cards} - {None}
+
+def repeats_first_page(current_page, first_page, links, first_links):
+    # Pages are loaded by PAGE_PARAM; if the site ignores it, page 2 comes back
+    # with page 1's cards and every later page would too.
+    if current_page == first_page + 1 and links and links == first_links:
+        logger.warning(f"Page {current_page} repeats page {first_page}, the site ignores ?{PAGE_PARAM}=N")
+        return True
+    return False
+
+def unseen(listings, seen):
+    # The site can shift while we page through it; a listing already returned
+    # from an earlier page is dropped.
+    unique = [l for l in listings if l.link is None or l.link not in seen]
+    seen.update(l.link for l in unique)
+    if len(unique) < len(listings):
+        logger.info(f"Dropped {len(listings) - len(unique)} listings already seen on earlier pages")
+    return unique
+
+def engine_pages(engine, plan, predicate, bulk, browser_pool, max_pages, first_page, strict):
+    pages = ENGINES[engine](bulk, browser_pool, plan, max_pages, first_page, strict)
+    seen = set()
+    first_links = None
+    try:
+        for current_page, raw_cards in pages:
+            logger.info(f"Cards found on page: {len(raw_cards)}")
+            links = card_links(raw_cards)
+            if current_page == first_page:
+                first_links = links
+            elif repeats_first_page(current_page, first_page, links, first_links):
+                if strict:
+                    raise IncompleteCrawl(f"page {current_page} repeats page {first_page}")
+                break
+            METRICS.count("pages", engine=engine)
+            yield current_page, unseen(parse_page(raw_cards, predicate), seen)
+    finally:
+        pages.close()
+
+def scrape_pages(filters=None, bulk=True, engine=None, browser_pool=None, max_pages=MAX_PAGES, first_page=1,
+                 strict=False):
+    engine = engine or SCRAPER_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown scraper engine: {engine}")
+
+    logger.info(f"Scraping CasaYes with filters: {filters} (engine: {engine})")
+    plan = plan_search(filters, SEARCH_PUSHDOWN)
+    logger.info(f"Search URL: {page_url(1, plan)} (pushed down: {plan['pushed']}, local only: {plan['local']})")
+
+    predicate = compile_filters(filters)
+    pages = engine_pages(engine, plan, predicate, bulk, browser_pool, max_pages, first_page, strict)
+    try:
+        if pushed(plan):
+            # The site may have no page for a pushed-down search (a 404) or
+            # ignore a parameter we guessed wrong; with nothing on its first
+            # page, the unfiltered search is scraped instead and filtered locally.
+            found = False
+            try:
+                for item in pages:
+                    found = True
+                    yield item
+            except Exception as e:
+                if found:
+                    raise
+                logger.warning(f"Pushed-down search failed: {str(e)}")
+            if found:
+                return
+            logger.info("Nothing found with pushdown, retrying the unfiltered search.")
+            pages.close()
+            pages = engine_pages(engine, plan_search(filters, False), predicate, bulk, browser_pool,
+                                 max_pages, first_page, strict)
+
+        yield from pages
+    finally:
+        pages.close()
+
+def iter_casayes(filters=None, bulk=True, engine=None, browser_pool=None,
+                 max_pages=MAX_PAGES, max_listings=MAX_LISTINGS, max_scrape_time=MAX_SCRAPE_TIME):
+    found = 0
+    pages_scraped = 0
+    start_time = time.time()
+
+    pages = scrape_pages(filters, bulk, engine, browser_pool, max_pages)
+    try:
+        for current_page, page_listings in pages:
+            pages_scraped = current_page
+            found += len(page_listings)
+            yield current_page, page_listings
+
+            # Check for max scrape time
+            if time.time() - start_time > max_scrape_time:
+                logger.warning(f"Scraping stopped: exceeded max scrape time of {max_scrape_time} seconds")
+                break
+
+            # Check for max listings
+            if max_listings and found >= max_listings:
+                logger.info(f"Reached max listings limit: {max_listings}")
+                break
+    finally:
+        pages.close()
+        total_time = time.time() - start_time
+        METRICS.observe("scrape_seconds", total_time)
+        logger.info(f"Scraping completed: {found} listings found across {pages_scraped} pages in {total_time:.2f} seconds")
+
+def scrape_casayes(filters=None, bulk=True, engine=None, browser_pool=None,
+                   max_pages=MAX_PAGES, max_listings=MAX_LISTINGS, max_scrape_time=MAX_SCRAPE_TIME):
+    listings = []
+    for _, page_listings in iter_casayes(filters, bulk, engine, browser_pool, max_pages, max_listings, max_scrape_time):
+        listings.extend(page_listings)
+    return listings
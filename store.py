@@ -0,0 +1,245 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from unidecode import unidecode
+from listing import FIELDS, Listing
+
+logger = logging.getLogger(__name__)
+
+class IncompleteCrawl(Exception):
+    # Raised by a page source after its last page when some pages could not be
+    # read, so crawl() keeps the listings it did not see.
+    pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    link TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    price TEXT NOT NULL,
+    price_value INTEGER,
+    location TEXT,
+    location_norm TEXT,
+    area INTEGER,
+    bedrooms INTEGER,
+    bathrooms INTEGER,
+    typology TEXT,
+    position INTEGER,
+    content_hash TEXT,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_listings_price ON listings (price_value);
+CREATE INDEX IF NOT EXISTS idx_listings_area ON listings (area);
+CREATE INDEX IF NOT EXISTS idx_listings_bedrooms ON listings (bedrooms);
+CREATE INDEX IF NOT EXISTS idx_listings_bathrooms ON listings (bathrooms);
+CREATE INDEX IF NOT EXISTS idx_listings_typology ON listings (typology);
+CREATE INDEX IF NOT EXISTS idx_listings_location ON listings (location_norm);
+CREATE INDEX IF NOT EXISTS idx_listings_seen_at ON listings (seen_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def normalize_location(location):
+    return " ".join(unidecode(location).lower().split()) if location else None
+
+# price_value is derived from price, so it stays out of the hash.
+HASH_FIELDS = ["title", "price", "location", "area", "bedrooms", "bathrooms"]
+
+def content_hash(listing):
+    payload = json.dumps([getattr(listing, f) for f in HASH_FIELDS], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def typology_from_title(title):
+    match = re.search(r"\bT(\d+)\b", title or "", re.IGNORECASE)
+    return f"T{match.group(1)}" if match else None
+
+class ListingStore:
+    def __init__(self, path="listings.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(listings)")}
+            if "content_hash" not in columns:
+                self._conn.execute("ALTER TABLE listings ADD COLUMN content_hash TEXT")
+
+    def upsert(self, listings, seen_at=None, start_position=0):
+        seen_at = seen_at or time.time()
+        rows = [
+            (
+                l.link, l.title, l.price, l.price_value,
+                l.location, normalize_location(l.location),
+                l.area, l.bedrooms, l.bathrooms,
+                typology_from_title(l.title), position, content_hash(l), seen_at,
+            )
+            for position, l in enumerate(listings, start_position)
+            if l.link
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO listings (link, title, price, price_value, location, location_norm,
+                                      area, bedrooms, bathrooms, typology, position, content_hash, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link) DO UPDATE SET
+                    title = excluded.title, price = excluded.price, price_value = excluded.price_value,
+                    location = excluded.location, location_norm = excluded.location_norm,
+                    area = excluded.area, bedrooms = excluded.bedrooms, bathrooms = excluded.bathrooms,
+                    typology = excluded.typology, position = excluded.position,
+                    content_hash = excluded.content_hash, seen_at = excluded.seen_at
+            """, rows)
+        return len(rows)
+
+    def query(self, filters=None, max_age=None, limit=100):
+        # Mirrors filter_engine.compile_filters, including which missing values pass.
+        where, args = [], []
+        if max_age:
+            where.append("seen_at >= ?")
+            args.append(time.time() - max_age)
+        filters = filters or {}
+        if filters.get("typology"):
+            where.append("typology = ?")
+            args.append(filters["typology"].upper())
+        if filters.get("location"):
+            where.append("(location_norm IS NULL OR location_norm LIKE ?)")
+            args.append(f"%{normalize_location(filters['location'])}%")
+        if filters.get("min_price"):
+            where.append("price_value >= ?")
+            args.append(filters["min_price"])
+        if filters.get("max_price"):
+            where.append("price_value <= ?")
+            args.append(filters["max_price"])
+        if filters.get("area_min"):
+            where.append("area >= ?")
+            args.append(filters["area_min"])
+        if filters.get("area_max"):
+            where.append("(area IS NULL OR area <= ?)")
+            args.append(filters["area_max"])
+        if filters.get("bedrooms") is not None:
+            where.append("(bedrooms IS NULL OR bedrooms = ?)")
+            args.append(filters["bedrooms"])
+        if filters.get("wc") is not None:
+            where.append("(bathrooms IS NULL OR bathrooms = ?)")
+            args.append(filters["wc"])
+
+        sql = f"SELECT {', '.join(FIELDS)} FROM listings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seen_at DESC, position LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [Listing(*row) for row in self._conn.execute(sql, args)]
+
+    def fingerprints(self):
+        with self._lock:
+            return {row["link"]: (row["content_hash"], row["price"])
+                    for row in self._conn.execute("SELECT link, content_hash, price FROM listings")}
+
+    def remove(self, links):
+        links = list(links)
+        with self._lock, self._conn:
+            removed = [Listing(*row) for link in links for row in self._conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM listings WHERE link = ?", (link,))]
+            self._conn.executemany("DELETE FROM listings WHERE link = ?", [(link,) for link in links])
+        return removed
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def last_crawl_time(self):
+        value = self.get_meta("last_crawl_finished")
+        return float(value) if value else None
+
+    def is_fresh(self, max_age):
+        last = self.last_crawl_time()
+        return last is not None and time.time() - last < max_age
+
+    def touch(self, seen_at):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE listings SET seen_at = ? WHERE seen_at < ?", (seen_at, seen_at))
+
+    def prune(self, max_age):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM listings WHERE seen_at < ?", (time.time() - max_age,)).rowcount
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+def crawl(store, scrape_pages, max_age, stop_after_unchanged=0, max_scrape_time=None, **scrape_kwargs):
+    # With stop_after_unchanged=N the crawl ends after N consecutive pages with
+    # no new or changed listing. Listings past that point are assumed unchanged,
+    # so removals are only detected by full crawls (stop_after_unchanged=0).
+    # "changed" holds (listing, previous price text) pairs.
+    started = time.time()
+    known = store.fingerprints()
+    delta = {"new": [], "changed": [], "removed": []}
+    seen = set()
+    position = 0
+    unchanged_streak = 0
+    complete = True
+    short_circuited = False
+
+    pages = scrape_pages(None, **scrape_kwargs)
+    try:
+        for page_number, listings in pages:
+            page_changed = False
+            for listing in listings:
+                seen.add(listing.link)
+                previous = known.get(listing.link)
+                if previous is None:
+                    delta["new"].append(listing)
+                    page_changed = True
+                elif previous[0] != content_hash(listing):
+                    delta["changed"].append((listing, previous[1]))
+                    page_changed = True
+
+            store.upsert(listings, started, position)
+            position += len(listings)
+
+            unchanged_streak = 0 if page_changed else unchanged_streak + 1
+            if stop_after_unchanged and unchanged_streak >= stop_after_unchanged:
+                logger.info(f"Snapshot crawl: {unchanged_streak} unchanged pages in a row, stopping at page {page_number}")
+                complete = False
+                short_circuited = True
+                break
+            if max_scrape_time and time.time() - started > max_scrape_time:
+                logger.warning(f"Snapshot crawl stopped: exceeded max scrape time of {max_scrape_time} seconds")
+                complete = False
+                break
+    except IncompleteCrawl as e:
+        logger.warning(f"Snapshot crawl incomplete, not removing unseen listings: {e}")
+        complete = False
+    finally:
+        pages.close()
+
+    if not seen:
+        logger.warning("Snapshot crawl returned no listings, keeping the previous snapshot")
+        return delta
+
+    if complete:
+        delta["removed"] = store.remove(link for link in known if link not in seen)
+    elif short_circuited:
+        store.touch(started)
+    pruned = store.prune(max_age)
+    store.set_meta("last_crawl_started", started)
+    store.set_meta("last_crawl_finished", time.time())
+    logger.info(
+        f"Snapshot crawl ({'full' if complete else 'incremental'}) saw {len(seen)} listings: "
+        f"{len(delta['new'])} new, {len(delta['changed'])} changed, {len(delta['removed'])} removed, "
+        f"{pruned} pruned in {time.time() - started:.2f} seconds"
+    )
+    return delta
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import time
+import fakeredis
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobFailed, QueueFull, RateLimited, ScrapeQueue
+from listing import Listing
+
+def make_queue(**kwargs):
+    return ScrapeQueue(fakeredis.FakeRedis(decode_responses=True), **kwargs)
+
+def listing(n):
+    return Listing(title=f"T2 {n}", price=f"{n} €", location="Lisboa", link=f"https://casayes.pt/pt/imovel/{n}")
+
+def follow(jobs, job_id, **kwargs):
+    async def collect():
+        return [(page, batch) async for page, batch in jobs.follow(job_id, poll_interval=0.01, **kwargs)]
+    return asyncio.run(collect())
+
+def test_identical_searches_share_a_job():
+    jobs = make_queue()
+    first = jobs.submit({"location": "lisboa", "max_price": 300000})
+    assert jobs.submit({"max_price": 300000, "location": "Lisboa"}) == first
+    assert jobs.submit({"location": "porto"}) != first
+    assert jobs.queued() == 2
+
+def test_kinds_are_not_shared():
+    jobs = make_queue()
+    assert jobs.submit({"full": False}, kind="crawl") != jobs.submit({"full": False})
+
+def test_finished_job_is_not_joined():
+    jobs = make_queue()
+    first = jobs.submit({"location": "lisboa"})
+    job_id, _, _ = jobs.next_job(timeout=0)
+    jobs.finish(job_id)
+    assert jobs.submit({"location": "lisboa"}) != first
+
+def test_rate_limit_is_per_user():
+    jobs = make_queue(rate_limit=2)
+    jobs.submit({"location": "lisboa"}, user_id=1)
+    jobs.submit({"location": "porto"}, user_id=1)
+    with pytest.raises(RateLimited):
+        jobs.submit({"location": "faro"}, user_id=1)
+    jobs.submit({"location": "faro"}, user_id=2)
+
+def test_queue_full():
+    jobs = make_queue(max_queued=2)
+    jobs.submit({"location": "lisboa"})
+    jobs.submit({"location": "porto"})
+    with pytest.raises(QueueFull):
+        jobs.submit({"location": "faro"})
+    # Joining an in-flight job doesn't need a free slot.
+    jobs.submit({"location": "lisboa"})
+
+def test_next_job_is_fifo_and_marks_running():
+    jobs = make_queue()
+    first = jobs.submit({"location": "lisboa"})
+    second = jobs.submit({"location": "porto"})
+    assert jobs.position(second) == 2
+    job_id, kind, payload = jobs.next_job(timeout=0)
+    assert (job_id, kind, payload) == (first, "search", {"location": "lisboa"})
+    assert jobs.redis.hget(f"jobs:{first}", "status") == "running"
+    assert jobs.position(second) == 1
+
+def test_follow_yields_pages_in_order():
+    jobs = make_queue()
+    job_id = jobs.submit({"location": "lisboa"})
+    jobs.next_job(timeout=0)
+    for page in (1, 2, 3):
+        jobs.publish(job_id, page, [listing(page * 10), listing(page * 10 + 1)])
+    jobs.finish(job_id)
+
+    pages = follow(jobs, job_id)
+    assert [page for page, _ in pages] == [1, 2, 3]
+    assert pages[1][1] == [listing(20), listing(21)]
+
+def test_follow_reports_queue_position_then_failure():
+    jobs = make_queue()
+    jobs.submit({"location": "porto"})
+    job_id = jobs.submit({"location": "lisboa"})
+    positions = []
+
+    async def on_position(position):
+        positions.append(position)
+        if len(positions) == 1:
+            jobs.next_job(timeout=0)
+            jobs.next_job(timeout=0)
+            jobs.publish(job_id, 1, [listing(1)])
+            jobs.finish(job_id, error="boom")
+
+    with pytest.raises(JobFailed, match="boom"):
+        follow(jobs, job_id, on_position=on_position)
+    assert positions == [2]
+
+def test_job_of_a_dead_worker_is_not_joined():
+    jobs = make_queue(lease=60)
+    first = jobs.submit({"full": False}, kind="crawl")
+    jobs.next_job(timeout=0, worker="host:1:0")
+    jobs.heartbeat(first)
+    assert jobs.submit({"full": False}, kind="crawl") == first
+
+    jobs.redis.hset("jobs:running", first, time.time() - 61)
+    second = jobs.submit({"full": False}, kind="crawl")
+    assert second != first
+    assert jobs.redis.hget(f"jobs:{first}", "status") == "failed"
+
+def test_followers_of_a_dead_job_fail():
+    jobs = make_queue(lease=60)
+    job_id = jobs.submit({"location": "lisboa"})
+    jobs.next_job(timeout=0)
+    jobs.redis.hset(f"jobs:{job_id}", "heartbeat", time.time() - 61)
+    jobs.redis.hset("jobs:running", job_id, time.time() - 61)
+    with pytest.raises(JobFailed):
+        follow(jobs, job_id, timeout=5)
+
+def test_reap_terminated_worker():
+    jobs = make_queue()
+    mine = jobs.submit({"location": "lisboa"})
+    other = jobs.submit({"location": "porto"})
+    jobs.next_job(timeout=0, worker="host:1:0")
+    jobs.next_job(timeout=0, worker="host:2:1")
+    assert jobs.reap(worker="host:1:0") == [mine]
+    assert jobs.submit({"location": "lisboa"}) != mine
+    assert jobs.submit({"location": "porto"}) == other
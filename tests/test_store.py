@@ -0,0 +1,75 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import Listing
+from store import IncompleteCrawl, ListingStore, crawl
+
+MAX_AGE = 3600
+
+@pytest.fixture
+def store(tmp_path):
+    return ListingStore(str(tmp_path / "listings.db"))
+
+def listing(n, price=100000):
+    return Listing(title=f"T2 {n}", price=f"{price} €", location="Lisboa", link=f"https://casayes.pt/pt/imovel/{n}")
+
+def pages_of(*pages, fail=False):
+    # A scrape_pages stand-in yielding the given pages of listings.
+    def scrape_pages(filters=None, **kwargs):
+        for number, listings in enumerate(pages, 1):
+            yield number, listings
+        if fail:
+            raise IncompleteCrawl("page 3: boom")
+    return scrape_pages
+
+def links(store):
+    return {l.link for l in store.query(limit=1000)}
+
+def test_first_crawl_is_all_new(store):
+    delta = crawl(store, pages_of([listing(1), listing(2)], [listing(3)]), MAX_AGE)
+    assert delta["new"] == [listing(1), listing(2), listing(3)]
+    assert delta["changed"] == [] and delta["removed"] == []
+    assert store.count() == 3
+    assert store.last_crawl_time() is not None
+
+def test_new_changed_and_removed(store):
+    crawl(store, pages_of([listing(1), listing(2)], [listing(3)]), MAX_AGE)
+    delta = crawl(store, pages_of([listing(1, 90000), listing(2)], [listing(4)]), MAX_AGE)
+
+    assert delta["new"] == [listing(4)]
+    assert delta["changed"] == [(listing(1, 90000), "100000 €")]
+    assert delta["removed"] == [listing(3)]
+    assert links(store) == {listing(n).link for n in (1, 2, 4)}
+    assert store.fingerprints()[listing(1).link][1] == "90000 €"
+
+def test_short_circuit_touches_instead_of_removing(store):
+    crawl(store, pages_of([listing(1)], [listing(2)], [listing(3)]), MAX_AGE)
+    with store._conn:
+        store._conn.execute("UPDATE listings SET seen_at = seen_at - 600")
+    # Page 1 is unchanged, so the crawl stops before reading pages 2 and 3.
+    delta = crawl(store, pages_of([listing(1)], [], [listing(3, 1)]), MAX_AGE, stop_after_unchanged=1)
+
+    assert delta == {"new": [], "changed": [], "removed": []}
+    assert store.fingerprints()[listing(3).link][1] == "100000 €"
+    # Listings past the stop are assumed unchanged and stay fresh.
+    assert len(store.query(max_age=60, limit=1000)) == 3
+
+def test_incomplete_crawl_removes_nothing(store):
+    crawl(store, pages_of([listing(1), listing(2)], [listing(3)]), MAX_AGE)
+    delta = crawl(store, pages_of([listing(1)], [listing(4)], fail=True), MAX_AGE)
+
+    assert delta["new"] == [listing(4)]
+    assert delta["removed"] == []
+    assert links(store) == {listing(n).link for n in (1, 2, 3, 4)}
+
+def test_empty_crawl_keeps_snapshot(store):
+    crawl(store, pages_of([listing(1)]), MAX_AGE)
+    finished = store.last_crawl_time()
+    delta = crawl(store, pages_of([]), MAX_AGE)
+
+    assert delta["removed"] == []
+    assert store.count() == 1
+    assert store.last_crawl_time() == finished
@@ -0,0 +1,85 @@
+import os
+import sys
+import fakeredis
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import worker
+from listing import Listing
+from store import ListingStore
+from watches import TooManyWatches, WatchList
+
+def make_watches(**kwargs):
+    return WatchList(fakeredis.FakeRedis(decode_responses=True), **kwargs)
+
+def listing(n, price=200000, location="Lisboa", title=None):
+    return Listing(title=title or f"T2 {n}", price=f"{price} €", location=location,
+                   link=f"https://casayes.pt/pt/imovel/{n}")
+
+def delta(new=(), changed=()):
+    return {"new": list(new), "changed": list(changed), "removed": []}
+
+def test_new_listings_match_their_watch():
+    watches = make_watches()
+    lisboa = watches.add(1, {"location": "lisboa", "max_price": 300000})
+    watches.add(1, {"location": "porto"})
+
+    assert watches.notify(delta(new=[listing(1), listing(2, 400000), listing(3, location="Porto")])) == 2
+    alerts = dict(watches.pop_alerts())
+    assert alerts[lisboa] == [(listing(1), None)]
+    assert watches.pop_alerts() == []
+
+def test_only_price_changes_alert():
+    watches = make_watches()
+    key = watches.add(1, {"location": "lisboa"})
+    changed = [
+        (listing(1, 180000), "200000 €"),
+        # Same price, new title: a change for the snapshot, not for alerts.
+        (listing(2, title="T2 renovado"), "200000 €"),
+    ]
+
+    watches.notify(delta(changed=changed))
+    assert watches.pop_alerts() == [(key, [(listing(1, 180000), "200000 €")])]
+
+    assert watches.notify(delta(changed=changed[1:])) == 0
+    assert watches.pop_alerts() == []
+
+def test_shared_watch_is_matched_once_for_every_chat():
+    watches = make_watches()
+    key = watches.add(1, {"location": "Lisboa", "max_price": 300000})
+    assert watches.add(2, {"max_price": 300000, "location": "lisboa"}) == key
+    assert watches.count() == 1
+
+    watches.notify(delta(new=[listing(1)]))
+    alerts = watches.pop_alerts()
+    assert [k for k, _ in alerts] == [key]
+    assert watches.chats(key) == {1, 2}
+
+    watches.remove(1, 1)
+    assert watches.chats(key) == {2}
+    watches.remove(2, 1)
+    assert watches.count() == 0
+
+def test_max_per_chat():
+    watches = make_watches(max_per_chat=1)
+    watches.add(1, {"location": "lisboa"})
+    with pytest.raises(TooManyWatches):
+        watches.add(1, {"location": "porto"})
+
+def test_first_crawl_sends_no_alerts(tmp_path, monkeypatch):
+    watches = make_watches()
+    watches.add(1, {"location": "lisboa"})
+    store = ListingStore(str(tmp_path / "listings.db"))
+    pages = [[listing(1)]]
+
+    def scrape_pages(filters=None, **kwargs):
+        yield from enumerate(pages, 1)
+
+    monkeypatch.setattr(worker, "scrape_pages", scrape_pages)
+    worker.run_crawl(store, None, True, watches)
+    assert watches.pop_alerts() == []
+
+    pages = [[listing(1), listing(2)]]
+    worker.run_crawl(store, None, True, watches)
+    assert [items for _, items in watches.pop_alerts()] == [[(listing(2), None)]]
@@ -0,0 +1,127 @@
+import json
+import logging
+from cache import canonical_filters, filters_key
+from filter_engine import ListingColumns, compile_filters
+from listing import pack_rows, unpack_rows
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUED_ALERTS = 1000
+
+class TooManyWatches(Exception):
+    pass
+
+class WatchList:
+    # Saved searches. Each distinct filter set is stored once in the
+    # {prefix}:filters hash with its subscribed chats in {prefix}:{key}:chats,
+    # so a search watched by many users is matched once per crawl.
+    # {prefix}:chat:{id} lists a chat's watches in the order they were added.
+    # Crawls push matching listings to {prefix}:alerts for the bot to send.
+    def __init__(self, redis_client, max_per_chat=5, prefix="watches"):
+        self.redis = redis_client
+        self.max_per_chat = max_per_chat
+        self.prefix = prefix
+
+    def _chat_key(self, chat_id):
+        return f"{self.prefix}:chat:{chat_id}"
+
+    def _chats_key(self, key):
+        return f"{self.prefix}:{key}:chats"
+
+    def add(self, chat_id, filters):
+        filters = canonical_filters(filters)
+        key = filters_key(filters)
+        keys = self.redis.lrange(self._chat_key(chat_id), 0, -1)
+        if key in keys:
+            return key
+        if len(keys) >= self.max_per_chat:
+            raise TooManyWatches(f"Máximo de {self.max_per_chat} pesquisas seguidas")
+
+        pipe = self.redis.pipeline()
+        pipe.hset(f"{self.prefix}:filters", key, json.dumps(filters, sort_keys=True))
+        pipe.sadd(self._chats_key(key), chat_id)
+        pipe.rpush(self._chat_key(chat_id), key)
+        pipe.execute()
+        return key
+
+    def remove(self, chat_id, number):
+        # number is the 1-based position shown by for_chat.
+        keys = self.redis.lrange(self._chat_key(chat_id), 0, -1)
+        if not 1 <= number <= len(keys):
+            return None
+        key = keys[number - 1]
+        filters = self.filters(key)
+        self.redis.lrem(self._chat_key(chat_id), 0, key)
+        self.redis.srem(self._chats_key(key), chat_id)
+        if not self.redis.scard(self._chats_key(key)):
+            self.redis.hdel(f"{self.prefix}:filters", key)
+        return filters
+
+    def filters(self, key):
+        raw = self.redis.hget(f"{self.prefix}:filters", key)
+        return json.loads(raw) if raw else None
+
+    def for_chat(self, chat_id):
+        keys = self.redis.lrange(self._chat_key(chat_id), 0, -1)
+        return [(key, self.filters(key)) for key in keys]
+
+    def all(self):
+        return {key: json.loads(raw) for key, raw in self.redis.hgetall(f"{self.prefix}:filters").items()}
+
+    def chats(self, key):
+        return {int(chat_id) for chat_id in self.redis.smembers(self._chats_key(key))}
+
+    def count(self):
+        return self.redis.hlen(f"{self.prefix}:filters")
+
+    def match(self, delta):
+        # New listings and price changes from a crawl delta, per watched
+        # search. The delta is read into columns once and every watch's
+        # compiled filter selects from them, so one crawl serves all watches.
+        # Returns {key: [(listing, previous price or None), ...]}.
+        watched = self.all()
+        items = [(listing, None) for listing in delta["new"]]
+        items += [(listing, previous) for listing, previous in delta["changed"] if listing.price != previous]
+        if not watched or not items:
+            return {}
+
+        columns = ListingColumns([listing for listing, _ in items])
+        matches = {}
+        for key, filters in watched.items():
+            selected = compile_filters(filters).select(columns)
+            if selected:
+                matches[key] = [items[i] for i in selected]
+        return matches
+
+    def notify(self, delta):
+        matches = self.match(delta)
+        alerts_key = f"{self.prefix}:alerts"
+        for key, items in matches.items():
+            self.redis.rpush(alerts_key, json.dumps({
+                "key": key,
+                "rows": pack_rows(listing for listing, _ in items),
+                "previous": [previous for _, previous in items],
+            }, separators=(",", ":")))
+        if matches:
+            # Alerts wait here while the bot is down or paused; keep the newest.
+            self.redis.ltrim(alerts_key, -MAX_QUEUED_ALERTS, -1)
+            METRICS.count("watch_alerts", len(matches))
+            logger.info(f"Queued alerts for {len(matches)} of {self.count()} watched searches")
+        return len(matches)
+
+    def pop_alerts(self, limit=100):
+        alerts = []
+        for _ in range(limit):
+            raw = self.redis.lpop(f"{self.prefix}:alerts")
+            if raw is None:
+                break
+            alert = json.loads(raw)
+            alerts.append((alert["key"], list(zip(unpack_rows(alert["rows"]), alert["previous"]))))
+        return alerts
+
+    def prefetch(self, store, cache, max_age, limit):
+        # Watched searches go to the result cache straight from the fresh
+        # snapshot, so asking one is instant even once the snapshot ages out.
+        for filters in self.all().values():
+            cache.set(filters, store.query(filters, max_age=max_age, limit=limit))
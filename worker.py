@@ -0,0 +1,172 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from browser_pool import BrowserPool
+from cache import ResultCache
+from jobs import ScrapeQueue, make_redis
+from scraper import MAX_LISTINGS, iter_casayes, scrape_pages
+from store import ListingStore, crawl
+from crawler import sharded_pages
+from metrics import METRICS, profiled
+from watches import WatchList
+from config import (
+    CRAWL_SHARD_WORKERS, BROWSER_CONTEXT_MAX_USES, RESULT_CACHE_TTL, RESULT_CACHE_STALE_TTL, JOB_RESULT_TTL, JOB_LEASE,
+    SNAPSHOT_DB_PATH, SNAPSHOT_MAX_AGE, SNAPSHOT_MAX_PAGES, SNAPSHOT_MAX_SCRAPE_TIME, SNAPSHOT_STOP_AFTER_UNCHANGED
+)
+
+logger = logging.getLogger(__name__)
+
+def run_search(jobs, cache, pool, job_id, filters):
+    results = []
+    for page_number, batch in iter_casayes(filters, browser_pool=pool):
+        results.extend(batch)
+        jobs.publish(job_id, page_number, batch)
+    cache.set(filters, results)
+
+def run_crawl(store, pool, full, watches=None, cache=None):
+    # The first crawl fills an empty snapshot; everything in it is "new", so
+    # it sends no alerts.
+    first = store.last_crawl_time() is None
+    if full and CRAWL_SHARD_WORKERS > 1:
+        delta = crawl(
+            store, sharded_pages, SNAPSHOT_MAX_AGE,
+            max_scrape_time=SNAPSHOT_MAX_SCRAPE_TIME,
+            max_pages=SNAPSHOT_MAX_PAGES, workers=CRAWL_SHARD_WORKERS
+        )
+    else:
+        delta = crawl(
+            store, scrape_pages, SNAPSHOT_MAX_AGE,
+            stop_after_unchanged=0 if full else SNAPSHOT_STOP_AFTER_UNCHANGED,
+            max_scrape_time=SNAPSHOT_MAX_SCRAPE_TIME,
+            browser_pool=pool, max_pages=SNAPSHOT_MAX_PAGES, strict=True
+        )
+
+    if watches is not None and store.is_fresh(SNAPSHOT_MAX_AGE):
+        if not first:
+            watches.notify(delta)
+        if cache is not None:
+            watches.prefetch(store, cache, SNAPSHOT_MAX_AGE, MAX_LISTINGS)
+    return delta
+
+def profiled_job(name, run, *args):
+    # Runs on the pool's thread, which is the one cProfile has to watch.
+    with profiled(name):
+        return run(*args)
+
+def worker_name(index, pid=None):
+    # Unique across machines sharing the queue; WorkerPool rebuilds it from
+    # the process id to fail the jobs of a worker it had to terminate.
+    return f"{socket.gethostname()}:{pid or os.getpid()}:{index}"
+
+def wait_renewing_lease(jobs, job_id, future):
+    # The job runs on the browser pool's thread; this one keeps its lease.
+    while True:
+        try:
+            return future.result(timeout=jobs.lease / 4)
+        except FutureTimeout:
+            jobs.heartbeat(job_id)
+
+def run_worker(redis_url, index, stop_event, report_metrics=False):
+    # Worker processes publish their metrics for the bot to export; threads
+    # already share its registry.
+    jobs = ScrapeQueue(make_redis(redis_url), result_ttl=JOB_RESULT_TTL, lease=JOB_LEASE)
+    name = worker_name(index)
+    cache = ResultCache(jobs.redis, ttl=RESULT_CACHE_TTL, stale_ttl=RESULT_CACHE_STALE_TTL)
+    store = ListingStore(SNAPSHOT_DB_PATH)
+    watches = WatchList(jobs.redis)
+    # One warm browser per worker; the pool keeps Playwright on a single thread.
+    pool = BrowserPool(size=1, max_uses=BROWSER_CONTEXT_MAX_USES)
+    logger.info(f"Scrape worker {index} started (pid {os.getpid()})")
+
+    try:
+        while not stop_event.is_set():
+            job = jobs.next_job(timeout=1, worker=name)
+            if job is None:
+                continue
+
+            job_id, kind, payload = job
+            logger.info(f"Worker {index} running {kind} job {job_id}")
+            try:
+                with METRICS.timer("job_seconds", kind=kind):
+                    if kind == "search":
+                        future = pool.submit(profiled_job, "search", run_search, jobs, cache, pool, job_id, payload)
+                    elif kind == "crawl":
+                        future = pool.submit(profiled_job, "crawl", run_crawl, store, pool, payload.get("full", False),
+                                             watches, cache)
+                    else:
+                        raise ValueError(f"Unknown job kind: {kind}")
+                    wait_renewing_lease(jobs, job_id, future)
+                jobs.finish(job_id)
+                METRICS.count("jobs", kind=kind, status="done")
+            except Exception as e:
+                logger.error(f"Worker {index} failed {kind} job {job_id}: {str(e)}", exc_info=True)
+                jobs.finish(job_id, error=str(e))
+                METRICS.count("jobs", kind=kind, status="failed")
+            jobs.report_worker(index, pool.stats.snapshot())
+            if report_metrics:
+                jobs.report_metrics(index, METRICS.snapshot())
+    finally:
+        pool.shutdown()
+        logger.info(f"Scrape worker {index} stopped")
+
+def _process_main(redis_url, index, stop_event):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()]
+    )
+    run_worker(redis_url, index, stop_event, report_metrics=True)
+
+class WorkerPool:
+    # Worker processes when Redis is real; threads with the in-process fake
+    # Redis, which other processes cannot see.
+    def __init__(self, redis_url, size):
+        self.redis_url = redis_url
+        self.size = size
+        self.use_threads = redis_url.startswith("fakeredis://")
+        self._stop = threading.Event() if self.use_threads else multiprocessing.get_context("spawn").Event()
+        self._workers = []
+
+    def start(self):
+        for i in range(self.size):
+            if self.use_threads:
+                worker = threading.Thread(target=run_worker, args=(self.redis_url, i, self._stop),
+                                          name=f"scrape-worker-{i}", daemon=True)
+            else:
+                worker = multiprocessing.get_context("spawn").Process(
+                    target=_process_main, args=(self.redis_url, i, self._stop), name=f"scrape-worker-{i}")
+            worker.start()
+            self._workers.append(worker)
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        terminated = []
+        for index, worker in enumerate(self._workers):
+            worker.join(timeout)
+            if not self.use_threads and worker.is_alive():
+                logger.warning(f"{worker.name} did not stop in {timeout}s, terminating")
+                worker.terminate()
+                terminated.append(worker_name(index, worker.pid))
+        self._workers = []
+        if terminated:
+            # Their jobs would otherwise be joined until the lease runs out.
+            jobs = ScrapeQueue(make_redis(self.redis_url), lease=JOB_LEASE)
+            for name in terminated:
+                jobs.reap(worker=name)
+
+if __name__ == "__main__":
+    # Standalone workers for running scrapes on other machines than the bot.
+    from config import REDIS_URL, JOB_WORKERS
+    workers = WorkerPool(REDIS_URL, JOB_WORKERS)
+    workers.start()
+    try:
+        workers.join()
+    except KeyboardInterrupt:
+        workers.stop()